@@ -0,0 +1,71 @@
+# Compares calc_engine's numeric backends on a corpus of calculator expressions, and
+# format_number() against plain str() for big integer results.
+#   python benchmarks/bench_calculator_backends.py --repeat 2000
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import calc_engine  # noqa: E402
+
+# What people type into a calculator, plus a few results that get long
+CORPUS = [
+    '0.1+0.2', '12*34+56/7-8', '1/3+1/6', '(1+2)*3-4/5', '100/7', '2**10', '2**0.5',
+    '123456789*987654321', 'round(10/3, 4)', 'abs(-2.5)*4', '1.5*1.5*1.5', '99//7+99%7',
+    '(3.75-1.25)/0.5', '1/7*7', '2**100', '3**200', '7**300/7**299', '1e10/3',
+]
+BIG_INTS = [3 ** 1000, 3 ** 3000, 3 ** 6000]
+
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the calculator number backends')
+    parser.add_argument('--repeat', type=int, default=1000, help='passes over the corpus')
+    parser.add_argument('--precision', type=int, default=calc_engine.DECIMAL_PRECISION)
+    args = parser.parse_args()
+
+    print("%d expressions x %d passes, decimal precision %d" % (len(CORPUS), args.repeat, args.precision))
+    print("%-10s %14s %14s %14s" % ('backend', 'compile us', 'evaluate us', 'format us'))
+    for backend in calc_engine.BACKENDS:
+        def compile_all():
+            calc_engine.compile_expression.cache_clear()
+            for text in CORPUS:
+                calc_engine.compile_expression(text, backend)
+
+        def evaluate_all():
+            for text in CORPUS:
+                calc_engine.evaluate(text, None, backend, args.precision)
+
+        results = [calc_engine.evaluate(text, None, backend, args.precision) for text in CORPUS]
+
+        def format_all():
+            for value in results:
+                calc_engine.format_number(value)
+
+        compile_all()
+        n = len(CORPUS)
+        compile_us = per_call_us(compile_all, max(1, args.repeat // 10)) / n
+        evaluate_us = per_call_us(evaluate_all, args.repeat) / n
+        format_us = per_call_us(format_all, args.repeat) / n
+        print("%-10s %14.2f %14.2f %14.2f" % (backend, compile_us, evaluate_us, format_us))
+
+    print()
+    print("%-10s %14s %18s  %s" % ('digits', 'str() us', 'format_number us', 'shown as'))
+    for n in BIG_INTS:
+        digits = len(str(n))
+        str_us = per_call_us(lambda: str(n), 100)
+        fmt_us = per_call_us(lambda: calc_engine.format_number(n), 100)
+        print("%-10d %14.1f %18.1f  %s" % (digits, str_us, fmt_us, calc_engine.format_number(n)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Requests and bytes on the wire for one calculation on calculator.py, typed on the keypad.
+# "before" is the no-JavaScript form path (every key is a POST that re-renders the page),
+# "after" is the keypad script (keys stay in the browser, "=" is one small JSON call).
+#   python benchmarks/bench_calculator_keypad.py --keys '123+456*7='
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import urllib.parse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from werkzeug.serving import make_server  # noqa: E402
+
+import calculator  # noqa: E402
+
+
+def http(port, method, path, body=b'', content_type=None):
+    # Returns (bytes sent, bytes received, response body) for one request on a fresh connection
+    headers = 'Host: 127.0.0.1:%d\r\nConnection: close\r\n' % port
+    if content_type:
+        headers += 'Content-Type: %s\r\nContent-Length: %d\r\n' % (content_type, len(body))
+    request = ('%s %s HTTP/1.1\r\n%s\r\n' % (method, path, headers)).encode() + body
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        sock.sendall(request)
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    return len(request), len(response), response.split(b'\r\n\r\n', 1)[1]
+
+
+def form_path(port, keys):
+    # The page is loaded once, then every key submits the form with the current display
+    sent, received, page = http(port, 'GET', '/')
+    requests = 1
+    display = ''
+    for key in keys:
+        body = urllib.parse.urlencode({'expression': display, 'btn': key}).encode()
+        s, r, page = http(port, 'POST', '/', body, 'application/x-www-form-urlencoded')
+        sent, received, requests = sent + s, received + r, requests + 1
+        display = page.split(b'name="expression" value="', 1)[1].split(b'"', 1)[0].decode()
+    return requests, sent, received, display
+
+
+def keypad_path(port, keys):
+    # The page is loaded once, the keypad script only calls /api/calc on "="
+    sent, received, _ = http(port, 'GET', '/')
+    requests = 1
+    display = ''
+    for key in keys:
+        if key == 'C':
+            display = ''
+        elif key == '=':
+            body = json.dumps({'expression': display}).encode()
+            s, r, reply = http(port, 'POST', '/api/calc', body, 'application/json')
+            sent, received, requests = sent + s, received + r, requests + 1
+            display = json.loads(reply)['result']
+        else:
+            display = key if display == 'Error' else display + key
+    return requests, sent, received, display
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the form and keypad paths of calculator.py')
+    parser.add_argument('--keys', default='123+456*7=', help='buttons pressed, in order')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no access log lines in the table
+    server = make_server('127.0.0.1', 0, calculator.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    try:
+        print("keys: %s (%d presses)" % (args.keys, len(args.keys)))
+        print("%-22s %9s %11s %11s %11s  %s" % ('', 'requests', 'sent B', 'received B', 'total B', 'display'))
+        for name, fn in (('form posts (before)', form_path), ('keypad script (after)', keypad_path)):
+            requests, sent, received, display = fn(port, args.keys)
+            print("%-22s %9d %11d %11d %11d  %s" % (name, requests, sent, received, sent + received, display))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+# Expression engine for calculator.py.
+# A small recursive descent parser for the calculator grammar (numbers, + - * / // % **,
+# unary signs, brackets, abs() and round()) that compiles each expression once into a
+# tree of closures. Nothing ever reaches eval(), and the limits below keep one request
+# from tying up a worker: the expression size and operation count are checked while
+# compiling, and integer results are capped before they are computed.
+#
+# Numbers follow one of three backends: 'float' (Python ints and floats, like eval()),
+# 'decimal' (decimal.Decimal at a chosen precision) or 'fraction' (exact rationals).
+import decimal
+import math
+import re
+from fractions import Fraction
+from functools import lru_cache
+
+# NumPy is optional and only used by evaluate_vector(). It takes longer to import than
+# the rest of the calculator put together, so it is loaded on the first vector request.
+np = None
+_numpy_missing = False
+
+MAX_EXPRESSION_LENGTH = 1000  # characters
+MAX_OPERATIONS = 500  # numbers, operators and calls in one expression
+MAX_DEPTH = 64  # bracket / unary nesting
+MAX_INT_BITS = 10000  # about 3000 decimal digits
+MAX_INT_DIGITS = int(MAX_INT_BITS * math.log10(2))  # the same limit for a Decimal about to become an int
+CACHE_SIZE = 1024  # compiled expressions kept, keyed by the expression text
+MAX_BATCH = 1000  # expressions per evaluate_many() call
+MAX_BINDINGS = 100000  # rows per evaluate_vector() call
+BACKENDS = ('float', 'decimal', 'fraction')
+DECIMAL_PRECISION = 28  # significant digits, decimal's own default
+MAX_PRECISION = 1000
+MAX_DISPLAY_DIGITS = 30  # longer results are shown in scientific notation
+SIGNIFICANT_DIGITS = 10  # digits kept when they are
+
+TOKEN_RE = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|(\*\*|//|[-+*/%(),])|([A-Za-z_]\w*))')
+
+
+class CalcError(ValueError):
+    pass
+
+
+# --- ARITHMETIC WITH LIMITS ---
+def _bits(value):
+    # Size of an exact number, numerator and denominator together for a Fraction
+    if isinstance(value, int):
+        return value.bit_length()
+    if isinstance(value, Fraction):
+        return value.numerator.bit_length() + value.denominator.bit_length() - 1
+    return 0
+
+
+def _check(value):
+    if _bits(value) > MAX_INT_BITS:
+        raise CalcError('number too large')
+    return value
+
+
+def _mul(a, b):
+    if _bits(a) + _bits(b) > MAX_INT_BITS + 1:
+        raise CalcError('number too large')
+    return a * b
+
+
+def _pow(a, b):
+    if isinstance(b, Fraction) and b.denominator == 1:
+        b = b.numerator
+    # Estimate the size before computing it, 9**9**9 must fail fast rather than run for minutes.
+    # Fractions grow with negative exponents too, ints turn into floats instead. Only exact
+    # bases can blow up; floats overflow, Decimals hit the context and arrays work elementwise.
+    if isinstance(a, (int, Fraction)):
+        if isinstance(b, int) and (b > 0 or isinstance(a, Fraction)):
+            if a not in (0, 1, -1) and (_bits(a) - 1) * abs(b) > MAX_INT_BITS:
+                raise CalcError('number too large')
+        elif isinstance(b, float) and _bits(a) > 1024:
+            raise CalcError('number too large')
+    result = a ** b
+    if isinstance(result, complex):
+        raise CalcError('complex result')
+    return _check(result)
+
+
+def _load_numpy():
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:
+            _numpy_missing = True
+        else:
+            np = numpy
+    return np
+
+
+def _round(x, ndigits=None):
+    if ndigits is not None:
+        # Decimal and fraction backends pass whole numbers as Decimal / Fraction
+        if isinstance(ndigits, float) or ndigits != int(ndigits):
+            raise CalcError('round() digits must be an integer')
+        ndigits = int(ndigits)
+        # round(1/3, 100000000) would build 10**100000000 first
+        if abs(ndigits) > MAX_INT_DIGITS:
+            raise CalcError('round() digits out of range')
+    if np is not None and isinstance(x, np.ndarray):
+        return np.round(x, ndigits or 0)
+    # round(Decimal('1e999999')) would build a million-digit int, size it from the exponent first
+    if ndigits is None and isinstance(x, decimal.Decimal) and x.is_finite() and x.adjusted() > MAX_INT_DIGITS:
+        raise CalcError('number too large')
+    return _check(round(x) if ndigits is None else round(x, ndigits))
+
+
+BINARY_OPS = {
+    '+': lambda a, b: _check(a + b),
+    '-': lambda a, b: _check(a - b),
+    '*': _mul,
+    '/': lambda a, b: _check(a / b),
+    '//': lambda a, b: a // b,
+    '%': lambda a, b: a % b,
+    '**': _pow,
+}
+FUNCTIONS = {'abs': (abs, 1, 1), 'round': (_round, 1, 2)}  # name -> (function, min args, max args)
+
+
+# --- PARSER ---
+def parse_number(literal, backend):
+    if backend == 'decimal':
+        return decimal.Decimal(literal)
+    if backend == 'fraction':
+        return Fraction(literal)  # '0.1' is exactly 1/10
+    value = float(literal) if any(c in literal for c in '.eE') else int(literal)
+    if isinstance(value, float) and math.isinf(value):
+        raise CalcError('number too large')
+    return value
+
+
+def tokenize(text, backend='float'):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match:
+            raise CalcError('unexpected %r' % text[pos])
+        number, op, name = match.groups()
+        if number:
+            tokens.append(('num', _check(parse_number(number, backend))))
+        elif op:
+            tokens.append(('op', op))
+        else:
+            tokens.append(('name', name))
+        pos = match.end()
+    tokens.append(('end', None))
+    return tokens
+
+
+class Parser:
+    # expr   := term (('+' | '-') term)*
+    # term   := unary (('*' | '/' | '//' | '%') unary)*
+    # unary  := ('+' | '-') unary | power
+    # power  := atom ('**' unary)?
+    # atom   := number | name | name '(' expr (',' expr)* ')' | '(' expr ')'
+    # Every rule returns a closure taking the variable bindings.
+    def __init__(self, text, backend='float'):
+        self.tokens = tokenize(text, backend)
+        self.pos = 0
+        self.operations = 0
+        self.depth = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, op):
+        kind, value = self.take()
+        if kind != 'op' or value != op:
+            raise CalcError('expected %r' % op)
+
+    def count(self):
+        self.operations += 1
+        if self.operations > MAX_OPERATIONS:
+            raise CalcError('expression too long')
+
+    def parse(self):
+        node = self.expr()
+        if self.peek()[0] != 'end':
+            raise CalcError('unexpected %r' % (self.peek()[1],))
+        return node
+
+    def binary(self, ops, operand):
+        node = operand()
+        while self.peek()[0] == 'op' and self.peek()[1] in ops:
+            fn = BINARY_OPS[self.take()[1]]
+            right = operand()
+            self.count()
+            node = (lambda fn, left, right: lambda env: fn(left(env), right(env)))(fn, node, right)
+        return node
+
+    def expr(self):
+        return self.binary(('+', '-'), self.term)
+
+    def term(self):
+        return self.binary(('*', '/', '//', '%'), self.unary)
+
+    def unary(self):
+        kind, value = self.peek()
+        if kind == 'op' and value in ('+', '-'):
+            self.take()
+            self.depth += 1
+            if self.depth > MAX_DEPTH:
+                raise CalcError('expression nested too deeply')
+            operand = self.unary()
+            self.depth -= 1
+            self.count()
+            if value == '+':
+                return operand
+            return lambda env: -operand(env)
+        return self.power()
+
+    def power(self):
+        base = self.atom()
+        if self.peek() == ('op', '**'):
+            self.take()
+            self.depth += 1
+            if self.depth > MAX_DEPTH:
+                raise CalcError('expression nested too deeply')
+            exponent = self.unary()  # right associative, and 2**-1 is allowed
+            self.depth -= 1
+            self.count()
+            return lambda env: _pow(base(env), exponent(env))
+        return base
+
+    def atom(self):
+        kind, value = self.take()
+        self.count()
+        if kind == 'num':
+            return lambda env: value
+        if kind == 'name':
+            if self.peek() == ('op', '('):
+                return self.call(value)
+            name = value
+
+            def variable(env):
+                try:
+                    return env[name]
+                except (KeyError, TypeError):
+                    raise CalcError('unknown name %r' % name)
+            return variable
+        if kind == 'op' and value == '(':
+            self.depth += 1
+            if self.depth > MAX_DEPTH:
+                raise CalcError('expression nested too deeply')
+            node = self.expr()
+            self.depth -= 1
+            self.expect(')')
+            return node
+        raise CalcError('unexpected end' if kind == 'end' else 'unexpected %r' % (value,))
+
+    def call(self, name):
+        if name not in FUNCTIONS:
+            raise CalcError('unknown function %r' % name)
+        fn, min_args, max_args = FUNCTIONS[name]
+        self.expect('(')
+        args = [self.expr()]
+        while self.peek() == ('op', ','):
+            self.take()
+            args.append(self.expr())
+        self.expect(')')
+        if not min_args <= len(args) <= max_args:
+            raise CalcError('%s() takes %d to %d arguments' % (name, min_args, max_args))
+        if len(args) == 1:
+            arg = args[0]
+            return lambda env: fn(arg(env))
+        return lambda env: fn(*[arg(env) for arg in args])
+
+
+# --- PUBLIC API ---
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(text, backend='float'):
+    # Returns a function of the variable bindings; raises CalcError for anything
+    # outside the grammar or over the limits. Compiled expressions are cached.
+    if backend not in BACKENDS:
+        raise CalcError('unknown backend %r' % backend)
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise CalcError('expression too long')
+    return Parser(text, backend).parse()
+
+
+def evaluate(text, variables=None, backend='float', precision=DECIMAL_PRECISION):
+    fn = compile_expression(text, backend)
+    if backend != 'decimal':
+        return fn(variables)
+    if not isinstance(precision, int) or not 1 <= precision <= MAX_PRECISION:
+        raise CalcError('precision must be between 1 and %d' % MAX_PRECISION)
+    with decimal.localcontext() as ctx:
+        ctx.prec = precision
+        try:
+            return fn(variables)
+        except decimal.DivisionByZero:
+            raise ZeroDivisionError('division by zero')
+        except decimal.Overflow:
+            raise CalcError('number too large')
+        except decimal.InvalidOperation:
+            raise CalcError('invalid operation')
+
+
+def _scientific(log10, negative):
+    exponent = math.floor(log10)
+    mantissa = '%.*f' % (SIGNIFICANT_DIGITS - 1, 10 ** (log10 - exponent))
+    if mantissa.startswith('10'):  # rounded up to the next power of ten
+        exponent += 1
+        mantissa = '%.*f' % (SIGNIFICANT_DIGITS - 1, 1)
+    return '%s%se%+d' % ('-' if negative else '', mantissa, exponent)
+
+
+def format_number(value, max_digits=MAX_DISPLAY_DIGITS):
+    # Display text for a result. str() of a big int takes time quadratic in its length,
+    # so past max_digits only the leading digits are worked out, from the logarithm.
+    if isinstance(value, Fraction) and value.denominator == 1:
+        value = value.numerator
+    if isinstance(value, int):
+        if value.bit_length() <= max_digits * 3.32:  # log2(10) bits per digit
+            return str(value)
+        return _scientific(math.log10(abs(value)), value < 0)
+    if isinstance(value, Fraction):
+        if _bits(value) <= max_digits * 3.32:
+            return str(value)
+        return _scientific(math.log10(abs(value.numerator)) - math.log10(value.denominator), value < 0)
+    return str(value)  # floats and Decimals already have a compact form
+
+
+def json_number(value):
+    # inf and nan have no JSON spelling
+    if isinstance(value, float) and not math.isfinite(value):
+        raise CalcError('result is not a finite number')
+    return value
+
+
+def evaluate_many(texts, backend='float', precision=DECIMAL_PRECISION):
+    # One result per expression: {'value': number} or {'error': message}. Decimal and
+    # fraction results are sent as text so no digits are lost to JSON floats, and in
+    # full: unlike the display, the API doesn't switch to scientific notation (str() stays
+    # cheap, _check() keeps every exact value under MAX_INT_BITS).
+    if len(texts) > MAX_BATCH:
+        raise CalcError('at most %d expressions per batch' % MAX_BATCH)
+    results = []
+    for text in texts:
+        try:
+            if not isinstance(text, str):
+                raise CalcError('expression must be a string')
+            value = evaluate(text, None, backend, precision)
+            results.append({'value': json_number(value) if isinstance(value, (int, float)) else str(value)})
+        except (CalcError, ArithmeticError) as e:
+            results.append({'error': str(e)})
+    return results
+
+
+def evaluate_vector(text, bindings):
+    # Evaluates one expression for every row of bindings ({'x': [1, 2, 3], ...}) and
+    # returns the list of results, None where a row has no finite result. With NumPy the
+    # compiled closures run once over float64 arrays, without it row by row.
+    fn = compile_expression(text)
+    columns = {name: list(values) for name, values in bindings.items()}
+    rows = {len(values) for values in columns.values()}
+    if len(rows) > 1:
+        raise CalcError('all bindings need the same number of values')
+    n = rows.pop() if rows else 1
+    if n > MAX_BINDINGS:
+        raise CalcError('at most %d rows per request' % MAX_BINDINGS)
+    for values in columns.values():
+        for v in values:
+            if isinstance(v, bool) or not isinstance(v, (int, float)):
+                raise CalcError('bindings must be numbers')
+
+    if _load_numpy() is not None:
+        with np.errstate(all='ignore'):
+            result = fn({name: np.asarray(values, dtype=np.float64) for name, values in columns.items()})
+            result = np.broadcast_to(np.asarray(result, dtype=np.float64), (n,))
+        return [v if math.isfinite(v) else None for v in result.tolist()]
+
+    results = []
+    for i in range(n):
+        try:
+            results.append(json_number(fn({name: float(values[i]) for name, values in columns.items()})))
+        except (CalcError, ArithmeticError):
+            results.append(None)
+    return results
@@ -1,7 +1,26 @@
-from flask import Flask, render_template_string, request
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from flask import Flask, render_template, request, jsonify
+from calc_engine import evaluate, evaluate_many, evaluate_vector, format_number, CalcError, BACKENDS
+
+try:
+    import resource  # Unix only, without it workers run with no memory ceiling
+except ImportError:
+    resource = None
 
 app = Flask(__name__)
 
+EVAL_WORKERS = int(os.environ.get('CALC_EVAL_WORKERS', 2))
+EVAL_TIMEOUT = float(os.environ.get('CALC_EVAL_TIMEOUT', 1.0))  # seconds, including the wait for a free worker
+EVAL_MEMORY_MB = int(os.environ.get('CALC_EVAL_MEMORY_MB', 256))  # extra address space a worker may take
+DECIMAL_PRECISION = int(os.environ.get('CALC_DECIMAL_PRECISION', 28))  # significant digits in decimal mode
+
 # This HTML string defines how the calculator looks in your browser
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -19,6 +38,7 @@ HTML_TEMPLATE = """
         .operator { background: #f39c12; color: white; }
         .equal { background: #2ecc71; grid-column: span 2; }
         .clear { background: #e74c3c; grid-column: span 2; }
+        select { width: 100%; margin-bottom: 10px; padding: 5px; background: #555; color: white; border: none; border-radius: 5px; }
     </style>
 </head>
 <body>
@@ -26,6 +46,11 @@ HTML_TEMPLATE = """
 <div class="calculator">
     <form method="POST">
         <input type="text" name="expression" value="{{ result }}" readonly>
+        <select name="backend">
+            <option value="float" {{ 'selected' if backend == 'float' }}>Float</option>
+            <option value="decimal" {{ 'selected' if backend == 'decimal' }}>Decimal</option>
+            <option value="fraction" {{ 'selected' if backend == 'fraction' }}>Exact fractions</option>
+        </select>
         
         <div class="buttons">
             <button type="submit" name="btn" value="C" class="clear">C</button>
@@ -53,13 +78,191 @@ HTML_TEMPLATE = """
     </form>
 </div>
 
+<script>
+    // With JavaScript the expression is built in the page and the server is only asked
+    // on "=". Without it every button still submits the form as before.
+    var form = document.querySelector('form');
+    var display = form.querySelector('input[name="expression"]');
+    if (window.fetch) form.addEventListener('click', function(e) {
+        var btn = e.target.closest('button');
+        if (!btn) return;
+        e.preventDefault();
+        var pressed = btn.value;
+        if (pressed === 'C') {
+            display.value = '';
+        } else if (pressed === '=') {
+            fetch({{ url_for('api_calc')|tojson }}, {method: 'POST', headers: {'Content-Type': 'application/json'},
+                                body: JSON.stringify({expression: display.value, backend: form.backend.value})})
+                .then(function(r) { return r.json(); })
+                .then(function(data) { display.value = data.result; })
+                .catch(function() { display.value = 'Error'; });
+        } else {
+            // If the previous result was Error, clear it before adding new numbers
+            display.value = (display.value === 'Error') ? pressed : display.value + pressed;
+        }
+    });
+</script>
+
 </body>
 </html>
 """
 
+def calculate(expression, backend='float', precision=DECIMAL_PRECISION):
+    # The text the display shows after "=". Parsed and evaluated by calc_engine,
+    # which only knows arithmetic, abs() and round().
+    try:
+        return format_number(evaluate(expression, None, backend, precision))
+    except Exception:
+        return "Error"
+
+# --- EVALUATION WORKERS ---
+# Expressions are evaluated in a few worker processes, never in the web worker.
+# Each has a memory ceiling, and one that doesn't answer within EVAL_TIMEOUT is killed
+# and replaced, so a request always gets its answer (or "Error") in time.
+# Workers are started by a fork server (spawn where there is none) rather than forked
+# from this process: replacements are made from request threads, and under
+# microverse_server.py even the first ones are, and a child forked while another
+# thread holds a lock can deadlock on it.
+EVAL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+WORKER_FUNCTIONS = {'calculate': calculate, 'evaluate_many': evaluate_many, 'evaluate_vector': evaluate_vector}
+
+class EvalError(Exception):
+    pass
+
+def address_space_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmSize:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def eval_worker(conn, memory_mb):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is for the server, it cleans up workers
+    if resource is not None and memory_mb:
+        # On top of what the worker's interpreter already maps
+        limit = address_space_kb() * 1024 + memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    while True:
+        try:
+            name, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = (True, WORKER_FUNCTIONS[name](*args))
+        except MemoryError:
+            reply = (False, 'out of memory')
+        except Exception as e:
+            reply = (False, str(e))
+        conn.send(reply)
+
+class EvalPool:
+    def __init__(self, workers, timeout, memory_mb):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self._context = multiprocessing.get_context(EVAL_START_METHOD)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._latencies = deque(maxlen=1000)  # seconds, most recent evaluations
+        self.evaluations = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.busy = 0
+        self.replaced = 0
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=eval_worker, args=(child_conn, self.memory_mb), daemon=True)
+        process.start()
+        child_conn.close()
+        self._idle.put((process, parent_conn))
+
+    def _replace(self, process, conn):
+        process.kill()
+        process.join()
+        conn.close()
+        with self._lock:
+            self.replaced += 1
+        self._spawn()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.workers):
+            self._spawn()
+
+    def run(self, name, *args):
+        # Result of WORKER_FUNCTIONS[name](*args), or EvalError if it can't be had in time
+        self.start()
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        try:
+            process, conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self.busy += 1
+            raise EvalError('all workers busy')
+        try:
+            conn.send((name, args))
+            if not conn.poll(max(0, deadline - time.perf_counter())):
+                with self._lock:
+                    self.timeouts += 1
+                self._replace(process, conn)
+                raise EvalError('timed out')
+            ok, value = conn.recv()
+        except (EOFError, OSError):
+            # The worker died, most likely killed by the memory ceiling
+            with self._lock:
+                self.crashes += 1
+            self._replace(process, conn)
+            raise EvalError('worker crashed')
+        self._idle.put((process, conn))
+        with self._lock:
+            self.evaluations += 1
+            self._latencies.append(time.perf_counter() - started)
+        if not ok:
+            raise EvalError(value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {'workers': self.workers, 'timeout': self.timeout, 'memory_mb': self.memory_mb,
+                    'evaluations': self.evaluations, 'timeouts': self.timeouts, 'crashes': self.crashes,
+                    'busy': self.busy, 'replaced': self.replaced,
+                    'latency_ms': {'p50': round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+                                   'p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 3) if latencies else None,
+                                   'max': round(latencies[-1] * 1000, 3) if latencies else None}}
+
+eval_pool = EvalPool(EVAL_WORKERS, EVAL_TIMEOUT, EVAL_MEMORY_MB)
+
+# render_template_string() would compile the page again on every request
+@lru_cache(maxsize=None)
+def compiled(source):
+    return app.jinja_env.from_string(source)
+
+def warm_up():
+    compiled(HTML_TEMPLATE)
+    eval_pool.start()
+
+def display_result(expression, backend='float'):
+    try:
+        return eval_pool.run('calculate', expression, backend)
+    except EvalError:
+        return "Error"
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     current_result = ""
+    backend = request.form.get('backend', 'float')
+    if backend not in BACKENDS:
+        backend = 'float'
     
     if request.method == 'POST':
         # Get the previous expression and the button pressed
@@ -69,13 +272,7 @@ def index():
         if pressed == 'C':
             current_result = ""
         elif pressed == '=':
-            try:
-                # Provide a restricted scope for eval for safety
-                allowed_names = {"abs": abs, "round": round}
-                # Evaluate the python math expression
-                current_result = str(eval(expression, {"__builtins__": None}, allowed_names))
-            except Exception:
-                current_result = "Error"
+            current_result = display_result(expression, backend)
         else:
             # If the previous result was Error, clear it before adding new numbers
             if expression == "Error":
@@ -83,10 +280,50 @@ def index():
             else:
                 current_result = expression + pressed
                 
-    return render_template_string(HTML_TEMPLATE, result=current_result)
+    return render_template(compiled(HTML_TEMPLATE), result=current_result, backend=backend)
+
+@app.route('/api/calc', methods=['POST'])
+def api_calc():
+    # What the keypad script calls on "=": {"expression": "12+7", "backend": "float"} -> {"result": "19"}
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('expression'), str):
+        return jsonify({'result': "Error"})
+    return jsonify({'result': display_result(data['expression'], data.get('backend', 'float'))})
+
+# JSON API, for scripts and other apps that want the calculator as a service:
+#   POST /api/eval {"expressions": ["1+2", "abs(-3)"]}
+#     -> {"results": [{"value": 3}, {"value": 3}]}
+#   POST /api/eval {"expressions": ["1/3"], "backend": "fraction"}     (or "decimal", with "precision": 50)
+#     -> {"results": [{"value": "1/3"}]}
+#   POST /api/eval {"expression": "x*2+y", "bindings": {"x": [1, 2], "y": [10, 20]}}
+#     -> {"results": [12.0, 24.0]}
+@app.route('/api/eval', methods=['POST'])
+def api_eval():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'expected a JSON object'}), 400
+    try:
+        if 'bindings' in data:
+            if not isinstance(data.get('expression'), str) or not isinstance(data['bindings'], dict):
+                raise CalcError('expected "expression" and a "bindings" object')
+            return jsonify({'results': eval_pool.run('evaluate_vector', data['expression'], data['bindings'])})
+        if not isinstance(data.get('expressions'), list):
+            raise CalcError('expected an "expressions" list')
+        return jsonify({'results': eval_pool.run('evaluate_many', data['expressions'], data.get('backend', 'float'),
+                                                 data.get('precision', DECIMAL_PRECISION))})
+    except (CalcError, EvalError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/stats')
+def stats():
+    return jsonify({'eval_pool': eval_pool.stats()})
 
 if __name__ == '__main__':
     # '0.0.0.0' allows you to access it from other devices on the same wifi if needed
     # Port 5000 is standard for Flask
+    # Start the evaluation workers before the first request instead of during it.
+    # With debug=True only the reloader's child serves requests.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up()
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -0,0 +1,148 @@
+# calc_engine, the calculator's replacement for eval(), and the calculator's /api/eval
+# and evaluation workers around it.
+#   python -m pytest Micro_Apps/python_based_apps/tests
+import os
+import re
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import calc_engine  # noqa: E402
+from calc_engine import CalcError, evaluate, evaluate_many, evaluate_vector, format_number  # noqa: E402
+import calculator  # noqa: E402
+
+
+@pytest.mark.parametrize('text, value', [
+    ('1+2*3', 7), ('(1+2)*3', 9), ('-2**2', -4), ('2**-1', 0.5), ('2**3**2', 512), ('7//2', 3), ('7%3', 1),
+    ('10/4', 2.5), ('1e3+.5', 1000.5), ('abs(-3)', 3), ('round(2.675, 2)', 2.67), ('round(7.5)', 8), ('--1', 1),
+])
+def test_grammar(text, value):
+    assert evaluate(text) == value
+
+
+@pytest.mark.parametrize('text, message', [
+    ('1+', 'unexpected end'), ('(1', "expected ')'"), ('1 2', 'unexpected 2'), ('1$2', "unexpected '$'"),
+    ('x', "unknown name 'x'"), ('__import__(1)', "unknown function '__import__'"),
+    ('abs(1, 2)', 'abs() takes 1 to 1 arguments'), ('round(1, 0.5)', 'round() digits must be an integer'),
+])
+def test_rejected(text, message):
+    with pytest.raises(CalcError, match=re.escape(message)):
+        evaluate(text)
+
+
+@pytest.mark.parametrize('text, message', [
+    ('9**9**9', 'number too large'), ('10**10**8', 'number too large'),
+    ('1' * 1001, 'expression too long'), ('1+' * 300 + '1', 'expression too long'),  # length, then operation count
+    ('(' * 65 + '1' + ')' * 65, 'nested too deeply'), ('-' * 65 + '1', 'nested too deeply'),
+    ('2**' * 65 + '1', 'nested too deeply'),
+])
+@pytest.mark.parametrize('backend', calc_engine.BACKENDS)
+def test_limits(text, message, backend):
+    start = time.perf_counter()
+    with pytest.raises(CalcError, match=message):
+        evaluate(text, backend=backend)
+    assert time.perf_counter() - start < 1  # refused up front, not after the work
+
+
+@pytest.mark.parametrize('text, backend, shown', [
+    ('0.1+0.2', 'float', '0.30000000000000004'), ('0.1+0.2', 'decimal', '0.3'), ('0.1+0.2', 'fraction', '3/10'),
+    ('1/3', 'float', '0.3333333333333333'), ('1/3', 'decimal', '0.3333333333333333333333333333'),
+    ('1/3', 'fraction', '1/3'), ('2**0.5', 'fraction', '1.4142135623730951'), ('6/3', 'fraction', '2'),
+    ('2**200', 'float', '1.606938044e+60'), ('1/3**200', 'fraction', '3.764861950e-96'),
+])
+def test_backends(text, backend, shown):
+    assert format_number(evaluate(text, backend=backend)) == shown
+
+
+def test_decimal_precision():
+    assert str(evaluate('1/7', backend='decimal', precision=50)) == '0.' + '142857' * 8 + '14'
+    with pytest.raises(CalcError):
+        evaluate('1/7', backend='decimal', precision=calc_engine.MAX_PRECISION + 1)
+
+
+@pytest.fixture(params=['numpy', 'plain'])
+def vector_mode(request, monkeypatch):
+    # evaluate_vector() with NumPy arrays when it is installed, and its row-by-row fallback
+    if request.param == 'numpy':
+        if calc_engine._load_numpy() is None:
+            pytest.skip('numpy is not installed')
+    else:
+        monkeypatch.setattr(calc_engine, 'np', None)
+        monkeypatch.setattr(calc_engine, '_numpy_missing', True)
+    return request.param
+
+
+def test_vector_power(vector_mode):
+    assert evaluate_vector('x**2', {'x': [1, 2, 3]}) == [1.0, 4.0, 9.0]
+    assert evaluate_vector('2**x', {'x': [1, 2, 3]}) == [2.0, 4.0, 8.0]
+    assert evaluate_vector('x**y', {'x': [4, 9], 'y': [0.5, 0.5]}) == [2.0, 3.0]
+
+
+def test_batch_results_keep_every_digit():
+    big = str(10 ** 40 + 1)
+    assert evaluate_many(['10**40+1'], 'float') == [{'value': 10 ** 40 + 1}]
+    assert evaluate_many(['10**40+1', '1/3', '2**-1'], 'fraction') == [{'value': big}, {'value': '1/3'},
+                                                                      {'value': '1/2'}]
+    assert evaluate_many(['10**40+1'], 'decimal', 50) == [{'value': big}]
+    # The keypad display is the one that shortens
+    assert calc_engine.format_number(10 ** 40 + 1) == '1.000000000e+40'
+
+
+@pytest.mark.parametrize('backend', calc_engine.BACKENDS)
+def test_round_digits_are_limited(backend):
+    assert calc_engine.format_number(evaluate('round(2/3, 2)', backend=backend)) in ('0.67', '67/100')
+    for text in ('round(1/3, 100000000)', 'round(1/3, -100000000)', 'round(1e999999)'):
+        with pytest.raises(CalcError):
+            evaluate(text, backend=backend)
+
+
+@pytest.fixture
+def client():
+    return calculator.app.test_client()
+
+
+def test_api_eval_batch(client):
+    r = client.post('/api/eval', json={'expressions': ['1+2', 'abs(-3)', '1/0', '9**9**9', 'x', 5]})
+    assert r.get_json() == {'results': [{'value': 3}, {'value': 3}, {'error': 'division by zero'},
+                                        {'error': 'number too large'}, {'error': "unknown name 'x'"},
+                                        {'error': 'expression must be a string'}]}
+    r = client.post('/api/eval', json={'expressions': ['1/3'], 'backend': 'fraction'})
+    assert r.get_json() == {'results': [{'value': '1/3'}]}
+    r = client.post('/api/eval', json={'expressions': ['1/4'], 'backend': 'decimal', 'precision': 50})
+    assert r.get_json() == {'results': [{'value': '0.25'}]}
+    assert client.post('/api/eval', json={'expressions': ['1'] * (calc_engine.MAX_BATCH + 1)}).status_code == 400
+    assert client.post('/api/eval', json=[1]).status_code == 400
+
+
+def test_api_eval_bindings(client):
+    r = client.post('/api/eval', json={'expression': 'x**2', 'bindings': {'x': [1, 2, 3]}})
+    assert r.status_code == 200 and r.get_json() == {'results': [1.0, 4.0, 9.0]}
+    r = client.post('/api/eval', json={'expression': 'x*2+y', 'bindings': {'x': [1, 2], 'y': [10, 20]}})
+    assert r.get_json() == {'results': [12.0, 24.0]}
+    r = client.post('/api/eval', json={'expression': '1/x', 'bindings': {'x': [0, 2]}})
+    assert r.get_json() == {'results': [None, 0.5]}
+    for bindings in ({'x': [1, 2], 'y': [1]}, {'x': ['1']}):
+        assert client.post('/api/eval', json={'expression': 'x', 'bindings': bindings}).status_code == 400
+
+
+def test_keypad(client):
+    assert client.post('/api/calc', json={'expression': '12+7'}).get_json() == {'result': '19'}
+    assert client.post('/api/calc', json={'expression': '1/0'}).get_json() == {'result': 'Error'}
+    assert client.post('/api/calc', json={'expression': '2**200'}).get_json() == {'result': '1.606938044e+60'}
+
+
+def test_eval_pool_timeout():
+    # A worker that doesn't answer in time is killed and replaced, and the pool keeps working
+    pool = calculator.EvalPool(1, 5, calculator.EVAL_MEMORY_MB)
+    assert pool.run('calculate', '6*7') == '42'
+    pool.timeout = 0.001
+    with pytest.raises(calculator.EvalError, match='timed out'):
+        pool.run('evaluate_many', ['(1/3)**3000'] * calc_engine.MAX_BATCH, 'fraction')
+    pool.timeout = 5
+    assert pool.run('calculate', '6*7') == '42'
+    stats = pool.stats()
+    assert stats['timeouts'] == 1 and stats['replaced'] == 1 and stats['evaluations'] == 2
@@ -0,0 +1,100 @@
+# Memory per connected board: the threaded Flask server vs the asyncio server.
+# Starts each server in a subprocess, opens N live /api/stream connections to it and
+# compares the server's resident memory before and after. Linux only (reads /proc).
+#   python benchmarks/bench_chess_connections.py --clients 500
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GAMES_DIR = os.path.dirname(HERE)
+sys.path.insert(0, GAMES_DIR)
+
+SERVERS = {
+    'flask (threaded)': "import chess_game; chess_game.app.run(host='127.0.0.1', port=%d, threaded=True)",
+    'asyncio (quart)': "from hypercorn.asyncio import serve; from hypercorn.config import Config; "
+                       "import asyncio, chess_game_async; c = Config(); c.bind = ['127.0.0.1:%d']; "
+                       "c.accesslog = None; c.backlog = 4096; asyncio.run(serve(chess_game_async.app, c))",
+}
+
+
+def proc_status(pid):
+    fields = {}
+    with open('/proc/%d/status' % pid) as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            fields[key] = value.strip()
+    return int(fields['VmRSS'].split()[0]), int(fields['Threads'])
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server on port %d did not start' % port)
+
+
+def open_stream(port, game_id):
+    sock = socket.create_connection(('127.0.0.1', port), timeout=10)
+    sock.sendall(b'GET /api/stream/%d HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n' % game_id)
+    data = b''
+    while b'data:' not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise RuntimeError('stream closed early: %r' % data[:200])
+        data += chunk
+    return sock
+
+
+def measure(name, code, port, clients, env):
+    server = subprocess.Popen([sys.executable, '-c', code % port], cwd=GAMES_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socks = []
+    try:
+        wait_for_port(port)
+        open_stream(port, 1).close()  # warm up imports and the game cache
+        time.sleep(0.5)
+        rss_before, threads_before = proc_status(server.pid)
+        start = time.perf_counter()
+        for _ in range(clients):
+            socks.append(open_stream(port, 1))
+        connect_seconds = time.perf_counter() - start
+        time.sleep(1)
+        rss_after, threads_after = proc_status(server.pid)
+    finally:
+        for sock in socks:
+            sock.close()
+        server.terminate()
+        server.wait()
+    per_client = (rss_after - rss_before) / clients
+    print("%-18s %8d %10d %10d %12.1f %9d %9.2f"
+          % (name, len(socks), rss_before, rss_after, per_client, threads_after, connect_seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare server memory per connected chess board')
+    parser.add_argument('--clients', type=int, default=300)
+    parser.add_argument('--port', type=int, default=5077)
+    args = parser.parse_args()
+
+    env = dict(os.environ, CHESS_DB=os.path.join(tempfile.mkdtemp(prefix='chess_conn_'), 'conn.db'))
+    os.environ['CHESS_DB'] = env['CHESS_DB']
+    import chess_game
+    chess_game.new_game(1)
+
+    print("%-18s %8s %10s %10s %12s %9s %9s"
+          % ('server', 'clients', 'RSS kB', 'RSS+N kB', 'kB/client', 'threads', 'connect s'))
+    for i, (name, code) in enumerate(SERVERS.items()):
+        measure(name, code, args.port + i, args.clients, env)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Seeds a chess database with lots of games and times the /lobby route against it.
+#   python benchmarks/bench_chess_lobby.py --games 100000
+#   python benchmarks/bench_chess_lobby.py --db lobby.db --no-seed   # reuse an earlier seed
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+STATUSES = ['waiting'] * 2 + ['active'] * 3 + ['checkmate', 'stalemate', 'draw'] * 5
+
+
+def seed(path, games, users):
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users (username, password) VALUES (?, 'x')",
+                     [('seed%d' % i,) for i in range(users)])
+    rows = []
+    for _ in range(games):
+        status = rng.choice(STATUSES)
+        white = rng.randrange(1, users + 1)
+        black = None if status == 'waiting' else rng.randrange(1, users + 1)
+        rows.append((white, black, START_FEN, status))
+    conn.executemany("INSERT INTO games (white_id, black_id, fen, turn, status) VALUES (?, ?, ?, 'w', ?)", rows)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed games and time the chess lobby')
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--db', help='database path (default: a temporary file)')
+    parser.add_argument('--no-seed', action='store_true', help='use the games already in --db')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='chess_lobby_'), 'lobby.db')
+    os.environ['CHESS_DB'] = path
+    import chess_game
+    chess_game.warm_up()  # creates the schema and indexes
+
+    if not args.no_seed:
+        start = time.perf_counter()
+        seed(path, args.games, args.users)
+        print("seeded %d games for %d users in %.1fs -> %s" % (args.games, args.users, time.perf_counter() - start, path))
+
+    client = chess_game.app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = 1
+        s['username'] = 'seed0'
+    with chess_game.db_pool.connection() as conn:
+        deep = conn.execute("SELECT id FROM games WHERE status = 'waiting' ORDER BY id LIMIT 1 OFFSET 100").fetchone()
+
+    def legacy_query():
+        # What the lobby used to run on every request
+        with chess_game.db_pool.connection() as conn:
+            conn.execute("SELECT * FROM games WHERE status != 'finished'").fetchall()
+
+    cases = [
+        ('lobby, first page', lambda: client.get('/lobby')),
+        ('lobby, deep page', lambda: client.get('/lobby?before=%d' % (deep[0] if deep else 1))),
+        ('old unbounded query', legacy_query),
+    ]
+    print("%-22s %10s %10s" % ('', 'mean ms', 'p95 ms'))
+    for name, fn in cases:
+        mean, p95 = timed(fn, args.repeat)
+        print("%-22s %10.2f %10.2f" % (name, mean, p95))
+
+
+if __name__ == '__main__':
+    main()
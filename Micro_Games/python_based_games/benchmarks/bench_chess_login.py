@@ -0,0 +1,72 @@
+# Login throughput of the chess server for different hash pool sizes.
+#   python benchmarks/bench_chess_login.py --pools 0 1 2 4 --threads 16 --seconds 5
+# Pool size 0 hashes inline on the request thread, like the server used to.
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+os.environ.setdefault('CHESS_DB', os.path.join(tempfile.mkdtemp(prefix='chess_login_'), 'login.db'))
+
+import chess_game  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+
+def run(workers, queue_limit, threads, seconds):
+    chess_game.hash_pool.shutdown()
+    chess_game.hash_pool = pool = chess_game.HashPool(workers, queue_limit)
+    stop = time.perf_counter() + seconds
+    latencies = []
+    results = {'ok': 0, 'busy': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def player():
+        client = chess_game.app.test_client()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            r = client.post('/', data={'action': 'login', 'username': 'bench', 'password': 'secret'})
+            elapsed = time.perf_counter() - start
+            key = 'ok' if r.status_code == 302 else 'busy' if r.status_code == 503 else 'failed'
+            with lock:
+                results[key] += 1
+                latencies.append(elapsed)
+
+    workers_threads = [threading.Thread(target=player) for _ in range(threads)]
+    for t in workers_threads:
+        t.start()
+    for t in workers_threads:
+        t.join()
+    pool.shutdown()
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0
+    return results, results['ok'] / seconds, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark chess logins against the hash pool size')
+    parser.add_argument('--pools', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--queue-limit', type=int, default=chess_game.HASH_QUEUE_LIMIT)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    with chess_game.db_pool.connection() as conn:
+        conn.execute("INSERT OR REPLACE INTO users (id, username, password) VALUES (1, 'bench', ?)",
+                     (generate_password_hash('secret', chess_game.HASH_METHOD),))
+        conn.commit()
+
+    print("method=%s threads=%d queue_limit=%d cpus=%s"
+          % (chess_game.HASH_METHOD, args.threads, args.queue_limit, os.cpu_count()))
+    print("%-8s %12s %10s %8s %8s" % ('workers', 'logins/s', 'p95 ms', 'busy', 'failed'))
+    for workers in args.pools:
+        results, rate, p95 = run(workers, args.queue_limit, args.threads, args.seconds)
+        print("%-8s %12.1f %10.1f %8d %8d" % (workers or 'inline', rate, p95, results['busy'], results['failed']))
+
+
+if __name__ == '__main__':
+    main()
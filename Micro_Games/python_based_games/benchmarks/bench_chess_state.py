@@ -0,0 +1,114 @@
+# Requests/sec for /api/state under concurrent load, with and without the connection pool
+# (game_cache is bypassed so every request reads SQLite).
+# Run from anywhere: python benchmarks/bench_chess_state.py --threads 16 --seconds 5
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+WORKDIR = tempfile.mkdtemp(prefix='chess_bench_')
+os.environ.setdefault('CHESS_DB', os.path.join(WORKDIR, 'pooled.db'))
+
+import chess_game  # noqa: E402
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+class ConnectPerRequest:
+    # The old behaviour: a fresh connection with default pragmas for every request
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        pass
+
+
+def seed(pool, games):
+    with pool.connection() as conn:
+        conn.executemany("INSERT INTO games (white_id, black_id, fen, turn, status) VALUES (1, 2, ?, 'w', 'active')",
+                         [(START_FEN,)] * games)
+        conn.commit()
+
+
+def run(pool, threads, seconds, games, writers):
+    chess_game.db_pool = pool
+    # Every read has to reach the database, otherwise both runs just measure game_cache
+    chess_game.game_cache = chess_game.GameCache(0)
+    client = chess_game.app.test_client
+    stop = time.perf_counter() + seconds
+    counts = [0] * threads
+    errors = [0]
+
+    def reader(i):
+        c = client()
+        n = 0
+        while time.perf_counter() < stop:
+            r = c.get('/api/state/%d' % (n % games + 1))
+            if r.status_code != 200:
+                errors[0] += 1
+            n += 1
+        counts[i] = n
+
+    def writer():
+        n = 0
+        while time.perf_counter() < stop:
+            with pool.connection() as conn:
+                conn.execute("UPDATE games SET fen = ? WHERE id = ?", (START_FEN, n % games + 1))
+                conn.commit()
+            n += 1
+            time.sleep(0.005)
+
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    workers += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return sum(counts) / seconds, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /api/state with and without the connection pool')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--writers', type=int, default=1)
+    args = parser.parse_args()
+
+    pooled = chess_game.db_pool
+    seed(pooled, args.games)
+
+    # Before: rollback journal and a connect() per request, on its own database file.
+    # Same games table as the app's current schema, so both runs serve the same query.
+    with pooled.connection() as conn:
+        schema = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'games'").fetchone()[0]
+    legacy_path = os.path.join(WORKDIR, 'legacy.db')
+    with sqlite3.connect(legacy_path) as conn:
+        conn.execute(schema)
+    legacy = ConnectPerRequest(legacy_path)
+    seed(legacy, args.games)
+
+    print("threads=%d writers=%d seconds=%.1f" % (args.threads, args.writers, args.seconds))
+    for name, pool in (('connect per request', legacy), ('pool size %d, WAL' % pooled.size, pooled)):
+        rps, errors = run(pool, args.threads, args.seconds, args.games, args.writers)
+        print("%-24s %9.0f req/s  errors=%d" % (name, rps, errors))
+
+
+if __name__ == '__main__':
+    main()
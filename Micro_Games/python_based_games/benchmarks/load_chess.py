@@ -0,0 +1,237 @@
+# Load generator for chess_game.py: N simulated players in pairs.
+# Each pair registers, logs in, creates and joins a game, then both players poll
+# /api/state at the GAME_TEMPLATE cadence (1s, with the ETag) and play random legal
+# moves on their turn. Finished games are replaced with new ones.
+#
+#   python benchmarks/load_chess.py --players 100 --duration 30           # in-process test client
+#   python benchmarks/load_chess.py --url http://127.0.0.1:5000 --players 50
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from chess_engine import Position, move_uci  # noqa: E402
+
+POLL_INTERVAL = 1.0  # what GAME_TEMPLATE uses
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, route, status, seconds):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route][status] += 1
+
+
+def route_name(method, path):
+    return '%s %s' % (method, re.sub(r'/\d+', '/<id>', path.split('?')[0]))
+
+
+class InProcessClient:
+    def __init__(self, app, recorder):
+        self.client = app.test_client()
+        self.recorder = recorder
+
+    def request(self, method, path, form=None, json_body=None, headers=None):
+        start = time.perf_counter()
+        r = self.client.open(path, method=method, data=form, json=json_body, headers=headers or {})
+        self.recorder.add(route_name(method, path), r.status_code, time.perf_counter() - start)
+        return r.status_code, r.headers, r.get_data()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, form=None, json_body=None, headers=None):
+        headers = dict(headers or {})
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=30) as r:
+                status, resp_headers, data = r.status, r.headers, r.read()
+        except urllib.error.HTTPError as e:
+            status, resp_headers, data = e.code, e.headers, e.read()
+        except OSError:
+            status, resp_headers, data = 'conn-error', {}, b''
+        self.recorder.add(route_name(method, path), status, time.perf_counter() - start)
+        return status, resp_headers, data
+
+
+class Player:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.etag = None
+        self.state = None
+
+    def signup(self, attempts=10):
+        form = {'username': self.name, 'password': 'load-test'}
+        for action in ('register', 'login'):
+            for _ in range(attempts):
+                # 503 means the password hash pool is saturated, back off like a user would
+                status, headers, _ = self.client.request('POST', '/', form=dict(form, action=action))
+                if status != 503:
+                    break
+                time.sleep(float(headers.get('Retry-After', 1)))
+        return status == 302
+
+    def create_game(self):
+        self.client.request('POST', '/create_game', form={})
+        _, _, page = self.client.request('GET', '/lobby')
+        ids = [int(i) for i in re.findall(rb'href="/game/(\d+)"', page)]
+        return max(ids) if ids else None
+
+    def join(self, game_id):
+        self.client.request('GET', '/join/%d' % game_id)
+        self.client.request('GET', '/game/%d' % game_id)
+        self.etag = None
+        self.state = None
+
+    def poll(self, game_id):
+        headers = {'If-None-Match': self.etag} if self.etag else {}
+        status, headers, body = self.client.request('GET', '/api/state/%d' % game_id, headers=headers)
+        if status == 200:
+            self.etag = headers.get('ETag')
+            self.state = json.loads(body)
+        return self.state
+
+    def move(self, game_id, rng):
+        moves = Position(self.state['fen']).legal_moves()
+        if not moves:
+            return
+        uci = move_uci(rng.choice(moves))
+        self.client.request('POST', '/api/move/%d' % game_id,
+                            json_body={'from': uci[:2], 'to': uci[2:4], 'promotion': uci[4:] or None})
+
+
+def play_pair(index, make_client, deadline, rng_seed, poll_interval):
+    rng = random.Random(rng_seed)
+    tag = '%d_%d' % (index, rng.randrange(10 ** 6))
+    white = Player(make_client(), 'lw_%s' % tag)
+    black = Player(make_client(), 'lb_%s' % tag)
+    if not (white.signup() and black.signup()):
+        return
+    # Spread pairs over the first poll interval so they don't tick in lockstep
+    time.sleep(rng.random() * poll_interval)
+    while time.time() < deadline:
+        game_id = white.create_game()
+        if game_id is None:
+            return
+        white.join(game_id)
+        black.join(game_id)
+        next_tick = time.time()
+        while time.time() < deadline:
+            for player, color in ((white, 'w'), (black, 'b')):
+                state = player.poll(game_id)
+                if state and state.get('status') == 'active' and state['fen'].split()[1] == color:
+                    player.move(game_id, rng)
+            if not state or state.get('status') not in ('waiting', 'active'):
+                break
+            next_tick += poll_interval
+            time.sleep(max(0, next_tick - time.time()))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def report(recorder, seconds, server_stats):
+    print("%-26s %8s %8s %8s %8s %8s %7s %s" % ('route', 'count', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'err %', 'statuses'))
+    total = errors = 0
+    for route in sorted(recorder.latencies):
+        values = sorted(recorder.latencies[route])
+        statuses = recorder.statuses[route]
+        failed = sum(n for status, n in statuses.items() if not isinstance(status, int) or status >= 500)
+        total += len(values)
+        errors += failed
+        print("%-26s %8d %8.1f %8.1f %8.1f %8.1f %7.2f %s" % (
+            route, len(values), len(values) / seconds, percentile(values, 0.50) * 1000,
+            percentile(values, 0.95) * 1000, percentile(values, 0.99) * 1000,
+            100.0 * failed / len(values), dict(sorted(statuses.items(), key=str))))
+    print("total %d requests, %.1f req/s, %.2f%% errors (5xx or connection failures)"
+          % (total, total / seconds, 100.0 * errors / total if total else 0))
+    if server_stats:
+        pool = server_stats.get('db_pool', {})
+        print("sqlite: %s pool borrows, %s waited for a connection (%s ms total), %s 'database is locked' errors"
+              % (pool.get('borrows'), pool.get('waits'), pool.get('wait_ms'), pool.get('locked_errors')))
+        print("cache: %s" % server_stats.get('game_cache'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate concurrent chess players')
+    parser.add_argument('--players', type=int, default=20, help='number of players (rounded up to pairs)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds to play after signing up')
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--url', help='run against this server instead of in-process')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.url:
+        client_class = lambda recorder: HttpClient(args.url, recorder)  # noqa: E731
+    else:
+        os.environ.setdefault('CHESS_DB', os.path.join(tempfile.mkdtemp(prefix='chess_load_'), 'load.db'))
+        # Keep signup from dominating the run; the hashing cost is benchmarked separately
+        os.environ.setdefault('CHESS_HASH_METHOD', 'pbkdf2:sha256:1000')
+        import chess_game
+        client_class = lambda recorder: InProcessClient(chess_game.app, recorder)  # noqa: E731
+    recorder = Recorder()
+    make_client = lambda: client_class(recorder)  # noqa: E731
+
+    pairs = (args.players + 1) // 2
+    start = time.time()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=play_pair, args=(i, make_client, deadline, args.seed * 1000 + i,
+                                                        args.poll_interval), daemon=True)
+               for i in range(pairs)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=max(0, deadline - time.time()) + 30)
+    elapsed = time.time() - start
+
+    _, _, body = client_class(Recorder()).request('GET', '/api/stats')
+    try:
+        server_stats = json.loads(body)
+    except ValueError:
+        server_stats = None
+    print("%d players (%d pairs), %.0fs" % (pairs * 2, pairs, elapsed))
+    report(recorder, elapsed, server_stats)
+
+
+if __name__ == '__main__':
+    main()
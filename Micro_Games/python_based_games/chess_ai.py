@@ -0,0 +1,279 @@
+# Computer opponent for the chess server.
+# Negamax alpha-beta with iterative deepening, a quiescence search over captures, a
+# fixed-size transposition table and MVV-LVA / killer move ordering. search() keeps to a
+# hard time budget: it checks the clock every few thousand nodes and answers with the
+# best move of the deepest iteration that finished.
+#
+#   python chess_ai.py                                   # think about the start position
+#   python chess_ai.py -t 2 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3'
+import argparse
+import time
+
+from chess_engine import Position, START_FEN, PAWN, EN_PASSANT, move_uci
+
+MATE = 100000
+MAX_PLY = 64
+TT_BITS = 18  # 2^18 entries, a few tens of MB per worker at most
+CHECK_EVERY = 1024  # nodes between clock checks, ~30ms at pure Python speeds
+
+# Material and piece-square bonuses, from white's point of view with a1 first
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+PST = (
+    (0, 0, 0, 0, 0, 0, 0, 0,
+     5, 10, 10, -20, -20, 10, 10, 5,
+     5, -5, -10, 0, 0, -10, -5, 5,
+     0, 0, 0, 20, 20, 0, 0, 0,
+     5, 5, 10, 25, 25, 10, 5, 5,
+     10, 10, 20, 30, 30, 20, 10, 10,
+     50, 50, 50, 50, 50, 50, 50, 50,
+     0, 0, 0, 0, 0, 0, 0, 0),
+    (-50, -40, -30, -30, -30, -30, -40, -50,
+     -40, -20, 0, 5, 5, 0, -20, -40,
+     -30, 5, 10, 15, 15, 10, 5, -30,
+     -30, 0, 15, 20, 20, 15, 0, -30,
+     -30, 5, 15, 20, 20, 15, 5, -30,
+     -30, 0, 10, 15, 15, 10, 0, -30,
+     -40, -20, 0, 0, 0, 0, -20, -40,
+     -50, -40, -30, -30, -30, -30, -40, -50),
+    (-20, -10, -10, -10, -10, -10, -10, -20,
+     -10, 5, 0, 0, 0, 0, 5, -10,
+     -10, 10, 10, 10, 10, 10, 10, -10,
+     -10, 0, 10, 10, 10, 10, 0, -10,
+     -10, 5, 5, 10, 10, 5, 5, -10,
+     -10, 0, 5, 10, 10, 5, 0, -10,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -20, -10, -10, -10, -10, -10, -10, -20),
+    (0, 0, 0, 5, 5, 0, 0, 0,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     5, 10, 10, 10, 10, 10, 10, 5,
+     0, 0, 0, 0, 0, 0, 0, 0),
+    (-20, -10, -10, -5, -5, -10, -10, -20,
+     -10, 0, 5, 0, 0, 0, 0, -10,
+     -10, 5, 5, 5, 5, 5, 0, -10,
+     0, 0, 5, 5, 5, 5, 0, -5,
+     -5, 0, 5, 5, 5, 5, 0, -5,
+     -10, 0, 5, 5, 5, 5, 0, -10,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -20, -10, -10, -5, -5, -10, -10, -20),
+    (20, 30, 10, 0, 0, 10, 30, 20,
+     20, 20, 0, 0, 0, 0, 20, 20,
+     -10, -20, -20, -20, -20, -20, -20, -10,
+     -20, -30, -30, -40, -40, -30, -30, -20,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30),
+)
+# SQUARE_SCORE[piece][sq]: value of that piece on that square for its own side,
+# black pieces use the white table mirrored vertically
+SQUARE_SCORE = [[PIECE_VALUES[p % 6] + PST[p % 6][sq if p < 6 else sq ^ 56] for sq in range(64)]
+                for p in range(12)]
+
+EXACT, LOWER, UPPER = range(3)
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    # Fixed number of slots indexed by the low bits of the Zobrist hash, so memory
+    # stays bounded however long the server runs. Deeper results win a slot.
+    def __init__(self, bits=TT_BITS):
+        self.mask = (1 << bits) - 1
+        self.slots = [None] * (1 << bits)
+
+    def get(self, key):
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def put(self, key, depth, flag, score, move):
+        i = key & self.mask
+        entry = self.slots[i]
+        if entry is None or entry[0] != key or entry[1] <= depth:
+            self.slots[i] = (key, depth, flag, score, move)
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+
+
+# One table per worker process, kept between moves so the next search starts warm
+_tt = None
+
+
+def evaluate(position):
+    # Static score from the side to move's point of view
+    score = 0
+    for sq, piece in enumerate(position.board):
+        if piece >= 0:
+            if piece < 6:
+                score += SQUARE_SCORE[piece][sq]
+            else:
+                score -= SQUARE_SCORE[piece][sq]
+    return -score if position.turn else score
+
+
+def is_capture(position, move):
+    return position.board[(move >> 6) & 63] >= 0 or move >> 15 == EN_PASSANT
+
+
+def capture_score(position, move):
+    # MVV-LVA: most valuable victim first, cheapest attacker breaks ties
+    victim = position.board[(move >> 6) & 63]
+    victim = PAWN if victim < 0 else victim % 6
+    return PIECE_VALUES[victim] * 10 - PIECE_VALUES[position.board[move & 63] % 6] // 10
+
+
+class Searcher:
+    def __init__(self, position, history, deadline, tt):
+        self.position = position
+        self.deadline = deadline
+        self.tt = tt
+        self.nodes = 0
+        self.best_move = None
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        # Hashes already on the board in this game plus the current search line,
+        # any repeat is scored as a draw
+        self.seen = list(history)
+
+    def tick(self):
+        self.nodes += 1
+        if not self.nodes % CHECK_EVERY and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def order(self, moves, ply, tt_move):
+        position = self.position
+        killers = self.killers[ply]
+
+        def key(move):
+            if move == tt_move:
+                return 1000000
+            if is_capture(position, move):
+                return 100000 + capture_score(position, move)
+            if (move >> 12) & 7:
+                return 90000 + ((move >> 12) & 7)
+            if move == killers[0]:
+                return 80000
+            if move == killers[1]:
+                return 79000
+            return 0
+
+        moves.sort(key=key, reverse=True)
+        return moves
+
+    def quiesce(self, alpha, beta, ply):
+        self.tick()
+        stand_pat = evaluate(self.position)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        if ply >= MAX_PLY:
+            return stand_pat
+        position = self.position
+        captures = [m for m in position.legal_moves() if is_capture(position, m)]
+        captures.sort(key=lambda m: capture_score(position, m), reverse=True)
+        for move in captures:
+            position.push(move)
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            position.pop()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def negamax(self, depth, alpha, beta, ply):
+        position = self.position
+        if ply and (position.hash in self.seen or position.halfmove >= 100):
+            return 0
+        if depth <= 0:
+            return self.quiesce(alpha, beta, ply)
+        self.tick()
+
+        key = position.hash
+        entry = self.tt.get(key)
+        tt_move = 0
+        if entry is not None:
+            tt_move = entry[4]
+            if ply and entry[1] >= depth:
+                score, flag = entry[3], entry[2]
+                if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                    return score
+
+        moves = position.legal_moves()
+        if not moves:
+            return -MATE + ply if position.in_check() else 0
+        if ply >= MAX_PLY:
+            return evaluate(position)
+
+        original_alpha = alpha
+        best_score, best_move = -MATE - 1, moves[0]
+        self.seen.append(key)
+        try:
+            for move in self.order(moves, ply, tt_move):
+                position.push(move)
+                try:
+                    score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+                finally:
+                    position.pop()
+                if score > best_score:
+                    best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                if alpha >= beta:
+                    if not is_capture(position, move) and move != self.killers[ply][0]:
+                        self.killers[ply][1] = self.killers[ply][0]
+                        self.killers[ply][0] = move
+                    break
+        finally:
+            self.seen.pop()
+
+        if not ply:
+            self.best_move = best_move
+        flag = UPPER if best_score <= original_alpha else LOWER if best_score >= beta else EXACT
+        self.tt.put(key, depth, flag, best_score, best_move)
+        return best_score
+
+
+def search(fen, history=(), seconds=1.0, max_depth=MAX_PLY):
+    # Returns {'move': uci or None, 'score', 'depth', 'nodes', 'nps', 'seconds'}.
+    # history holds the Zobrist hashes of earlier positions in the game.
+    global _tt
+    if _tt is None:
+        _tt = TranspositionTable()
+    start = time.perf_counter()
+    position = Position(fen)
+    searcher = Searcher(position, [h for h in history if h != position.hash], start + seconds, _tt)
+    moves = position.legal_moves()
+    best_move, best_score, depth_reached = (moves[0] if moves else None), 0, 0
+    if len(moves) > 1:
+        for depth in range(1, max_depth + 1):
+            try:
+                score = searcher.negamax(depth, -MATE - 1, MATE + 1, 0)
+            except SearchTimeout:
+                break
+            best_move, best_score, depth_reached = searcher.best_move, score, depth
+            elapsed = time.perf_counter() - start
+            # A mate is found, or the next iteration would almost certainly not finish
+            if abs(score) >= MATE - MAX_PLY or elapsed > seconds / 2:
+                break
+    elapsed = time.perf_counter() - start
+    return {'move': move_uci(best_move) if best_move is not None else None, 'score': best_score,
+            'depth': depth_reached, 'nodes': searcher.nodes, 'nps': int(searcher.nodes / elapsed) if elapsed else 0,
+            'seconds': round(elapsed, 3)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Let the chess server AI pick a move')
+    parser.add_argument('fen', nargs='?', default=START_FEN)
+    parser.add_argument('-t', '--time', type=float, default=1.0, help='seconds to think')
+    parser.add_argument('-d', '--depth', type=int, default=MAX_PLY, help='stop after this depth')
+    args = parser.parse_args()
+    print(search(args.fen, seconds=args.time, max_depth=args.depth))
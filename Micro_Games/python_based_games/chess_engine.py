@@ -0,0 +1,558 @@
+# Pure Python chess rules for the chess server.
+# Positions are 64-bit integer bitboards (a1 = bit 0, h8 = bit 63) plus a mailbox
+# for quick piece lookup. Leaper attacks and slider attacks for every blocker
+# configuration are precomputed once, so a legal-move check is a handful of table
+# lookups. The slider tables take a few hundred ms to build, so that happens on the
+# first Position() (or from build_tables() in a server's warm-up), not at import.
+import random
+import threading
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_CHARS = 'PNBRQKpnbrqk'  # piece index = color * 6 + piece type
+PROMOTION_CHARS = {'n': KNIGHT, 'b': BISHOP, 'r': ROOK, 'q': QUEEN}
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Move encoding: from | to << 6 | promotion piece type << 12 | flag << 15
+NORMAL, DOUBLE_PUSH, EN_PASSANT, CASTLE = range(4)
+
+RANK_1 = 0xFF
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_8 = RANK_1 << 56
+LAST_RANK = (RANK_8, RANK_1)
+
+SQUARE_NAMES = [f + r for r in '12345678' for f in 'abcdefgh']
+SQUARES = {name: sq for sq, name in enumerate(SQUARE_NAMES)}
+
+
+class IllegalMove(ValueError):
+    pass
+
+
+# --- PRECOMPUTED TABLES ---
+def _on_board(f, r):
+    return 0 <= f < 8 and 0 <= r < 8
+
+def _leaper_table(deltas):
+    table = []
+    for sq in range(64):
+        f, r = sq & 7, sq >> 3
+        bb = 0
+        for df, dr in deltas:
+            if _on_board(f + df, r + dr):
+                bb |= 1 << ((r + dr) * 8 + f + df)
+        table.append(bb)
+    return table
+
+KNIGHT_ATTACKS = _leaper_table([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_ATTACKS = _leaper_table([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+PAWN_ATTACKS = (_leaper_table([(-1, 1), (1, 1)]), _leaper_table([(-1, -1), (1, -1)]))
+
+ROOK_DIRS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+BISHOP_DIRS = ((1, 1), (-1, 1), (-1, -1), (1, -1))
+
+def _slide(sq, occ, dirs):
+    att = 0
+    f0, r0 = sq & 7, sq >> 3
+    for df, dr in dirs:
+        f, r = f0 + df, r0 + dr
+        while _on_board(f, r):
+            bit = 1 << (r * 8 + f)
+            att |= bit
+            if occ & bit:
+                break
+            f, r = f + df, r + dr
+    return att
+
+def _relevant_mask(sq, dirs):
+    # Squares whose occupancy can change the attack set (board edges never block)
+    mask = 0
+    f0, r0 = sq & 7, sq >> 3
+    for df, dr in dirs:
+        f, r = f0 + df, r0 + dr
+        while _on_board(f + df, r + dr):
+            mask |= 1 << (r * 8 + f)
+            f, r = f + df, r + dr
+    return mask
+
+def _slider_tables(dirs):
+    masks, tables = [], []
+    for sq in range(64):
+        mask = _relevant_mask(sq, dirs)
+        table = {}
+        sub = 0
+        while True:
+            table[sub] = _slide(sq, sub, dirs)
+            sub = (sub - mask) & mask
+            if not sub:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+ROOK_MASKS = ROOK_TABLES = BISHOP_MASKS = BISHOP_TABLES = None
+_tables_lock = threading.Lock()
+
+def build_tables():
+    global ROOK_MASKS, ROOK_TABLES, BISHOP_MASKS, BISHOP_TABLES
+    with _tables_lock:
+        if ROOK_TABLES is None:
+            BISHOP_MASKS, BISHOP_TABLES = _slider_tables(BISHOP_DIRS)
+            ROOK_MASKS, rook_tables = _slider_tables(ROOK_DIRS)
+            ROOK_TABLES = rook_tables  # last, other threads only check this one
+
+def rook_attacks(sq, occ):
+    return ROOK_TABLES[sq][occ & ROOK_MASKS[sq]]
+
+def bishop_attacks(sq, occ):
+    return BISHOP_TABLES[sq][occ & BISHOP_MASKS[sq]]
+
+def _between_table():
+    # BETWEEN[a][b]: squares strictly between a and b on a shared line, else 0
+    table = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        for dirs in (ROOK_DIRS, BISHOP_DIRS):
+            for d in dirs:
+                f, r = (a & 7) + d[0], (a >> 3) + d[1]
+                ray = 0
+                while _on_board(f, r):
+                    b = r * 8 + f
+                    table[a][b] = ray
+                    ray |= 1 << b
+                    f, r = f + d[0], r + d[1]
+    return table
+
+BETWEEN = _between_table()
+
+# Castling rights: 1 = K, 2 = Q, 4 = k, 8 = q. Moving from/to these squares clears rights.
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[0], CASTLE_MASK[4], CASTLE_MASK[7] = 13, 12, 14
+CASTLE_MASK[56], CASTLE_MASK[60], CASTLE_MASK[63] = 7, 3, 11
+CASTLE_ROOK = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}  # king target -> rook from/to
+
+# Zobrist keys. The seed is fixed because hashes are stored in the database and must
+# survive restarts; keys are 63-bit so they fit a signed SQLite INTEGER.
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST_PIECE = [[_zobrist_rng.getrandbits(63) for _ in range(64)] for _ in range(12)]
+ZOBRIST_CASTLE = [_zobrist_rng.getrandbits(63) for _ in range(16)]
+ZOBRIST_EP = [_zobrist_rng.getrandbits(63) for _ in range(8)]
+ZOBRIST_BLACK = _zobrist_rng.getrandbits(63)
+
+
+def encode_move(frm, to, promotion=0, flag=NORMAL):
+    return frm | to << 6 | promotion << 12 | flag << 15
+
+def move_uci(move):
+    promotion = (move >> 12) & 7
+    uci = SQUARE_NAMES[move & 63] + SQUARE_NAMES[(move >> 6) & 63]
+    if promotion:
+        uci += PIECE_CHARS[6 + promotion]
+    return uci
+
+
+# --- POSITION ---
+class Position:
+    def __init__(self, fen=START_FEN):
+        if ROOK_TABLES is None:
+            build_tables()
+        self.set_fen(fen)
+
+    def set_fen(self, fen):
+        parts = fen.split()
+        if len(parts) < 4:
+            raise ValueError('bad FEN: %r' % fen)
+        rows = parts[0].split('/')
+        if len(rows) != 8:
+            raise ValueError('bad FEN: %r' % fen)
+        self.bbs = [0] * 12
+        self.occ = [0, 0]
+        self.board = [-1] * 64
+        for i, row in enumerate(rows):
+            f = 0
+            for ch in row:
+                if ch.isdigit():
+                    f += int(ch)
+                    continue
+                piece = PIECE_CHARS.find(ch)
+                if piece < 0 or f > 7:
+                    raise ValueError('bad FEN: %r' % fen)
+                sq = (7 - i) * 8 + f
+                self.board[sq] = piece
+                self.bbs[piece] |= 1 << sq
+                self.occ[piece // 6] |= 1 << sq
+                f += 1
+            if f != 8:
+                raise ValueError('bad FEN: %r' % fen)
+        if parts[1] not in ('w', 'b'):
+            raise ValueError('bad FEN: %r' % fen)
+        if bin(self.bbs[KING]).count('1') != 1 or bin(self.bbs[6 + KING]).count('1') != 1:
+            raise ValueError('bad FEN: %r' % fen)
+        self.turn = WHITE if parts[1] == 'w' else BLACK
+        try:
+            self.castling = 0
+            for ch in parts[2]:
+                if ch != '-':
+                    self.castling |= {'K': 1, 'Q': 2, 'k': 4, 'q': 8}[ch]
+            self.ep = SQUARES[parts[3]] if parts[3] != '-' else -1
+            self.halfmove = int(parts[4]) if len(parts) > 4 else 0
+            self.fullmove = int(parts[5]) if len(parts) > 5 else 1
+        except (KeyError, ValueError):
+            raise ValueError('bad FEN: %r' % fen)
+        self._stack = []
+        self.hash = self.compute_hash()
+
+    def _ep_key(self):
+        # The en passant file only counts when the side to move can actually capture,
+        # so positions that repeat after a double push still hash the same
+        if self.ep < 0 or not PAWN_ATTACKS[self.turn ^ 1][self.ep] & self.bbs[self.turn * 6 + PAWN]:
+            return 0
+        return ZOBRIST_EP[self.ep & 7]
+
+    def compute_hash(self):
+        h = ZOBRIST_CASTLE[self.castling] ^ self._ep_key()
+        if self.turn == BLACK:
+            h ^= ZOBRIST_BLACK
+        for sq, piece in enumerate(self.board):
+            if piece >= 0:
+                h ^= ZOBRIST_PIECE[piece][sq]
+        return h
+
+    def fen(self):
+        rows = []
+        for r in range(7, -1, -1):
+            row, empty = '', 0
+            for f in range(8):
+                piece = self.board[r * 8 + f]
+                if piece < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += PIECE_CHARS[piece]
+            rows.append(row + (str(empty) if empty else ''))
+        castling = ''.join(c for bit, c in ((1, 'K'), (2, 'Q'), (4, 'k'), (8, 'q')) if self.castling & bit)
+        return '%s %s %s %s %d %d' % ('/'.join(rows), 'wb'[self.turn], castling or '-',
+                                      SQUARE_NAMES[self.ep] if self.ep >= 0 else '-',
+                                      self.halfmove, self.fullmove)
+
+    def copy(self):
+        return Position(self.fen())
+
+    # --- attacks ---
+    def attackers(self, sq, color, occ):
+        bbs = self.bbs
+        o = color * 6
+        return ((KNIGHT_ATTACKS[sq] & bbs[o + KNIGHT])
+                | (KING_ATTACKS[sq] & bbs[o + KING])
+                | (PAWN_ATTACKS[color ^ 1][sq] & bbs[o + PAWN])
+                | (bishop_attacks(sq, occ) & (bbs[o + BISHOP] | bbs[o + QUEEN]))
+                | (rook_attacks(sq, occ) & (bbs[o + ROOK] | bbs[o + QUEEN])))
+
+    def king_square(self, color):
+        return self.bbs[color * 6 + KING].bit_length() - 1
+
+    def in_check(self):
+        us = self.turn
+        return bool(self.attackers(self.king_square(us), us ^ 1, self.occ[0] | self.occ[1]))
+
+    # --- move generation ---
+    def pseudo_moves(self):
+        us, them = self.turn, self.turn ^ 1
+        bbs = self.bbs
+        own, enemy = self.occ[us], self.occ[them]
+        occ = own | enemy
+        empty = ~occ
+        o = us * 6
+        moves = []
+        add = moves.append
+
+        # pawns
+        pawns = bbs[o + PAWN]
+        if us == WHITE:
+            single = (pawns << 8) & empty & 0xFFFFFFFFFFFFFFFF
+            double = ((single & RANK_3) << 8) & empty
+            step = -8
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_6) >> 8) & empty
+            step = 8
+        last = LAST_RANK[us]
+        bb = single
+        while bb:
+            b = bb & -bb
+            to = b.bit_length() - 1
+            bb ^= b
+            if b & last:
+                for promo in (QUEEN, ROOK, BISHOP, KNIGHT):
+                    add(to + step | to << 6 | promo << 12)
+            else:
+                add(to + step | to << 6)
+        bb = double
+        while bb:
+            b = bb & -bb
+            to = b.bit_length() - 1
+            bb ^= b
+            add(to + 2 * step | to << 6 | DOUBLE_PUSH << 15)
+        attacks = PAWN_ATTACKS[us]
+        bb = pawns
+        while bb:
+            b = bb & -bb
+            frm = b.bit_length() - 1
+            bb ^= b
+            targets = attacks[frm] & enemy
+            while targets:
+                t = targets & -targets
+                to = t.bit_length() - 1
+                targets ^= t
+                if t & last:
+                    for promo in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        add(frm | to << 6 | promo << 12)
+                else:
+                    add(frm | to << 6)
+        if self.ep >= 0:
+            bb = PAWN_ATTACKS[them][self.ep] & pawns
+            while bb:
+                b = bb & -bb
+                bb ^= b
+                add((b.bit_length() - 1) | self.ep << 6 | EN_PASSANT << 15)
+
+        # pieces
+        not_own = ~own
+        for ptype, table in ((KNIGHT, KNIGHT_ATTACKS), (KING, KING_ATTACKS)):
+            bb = bbs[o + ptype]
+            while bb:
+                b = bb & -bb
+                frm = b.bit_length() - 1
+                bb ^= b
+                targets = table[frm] & not_own
+                while targets:
+                    t = targets & -targets
+                    targets ^= t
+                    add(frm | (t.bit_length() - 1) << 6)
+        for ptype in (BISHOP, ROOK, QUEEN):
+            bb = bbs[o + ptype]
+            while bb:
+                b = bb & -bb
+                frm = b.bit_length() - 1
+                bb ^= b
+                if ptype == BISHOP:
+                    targets = bishop_attacks(frm, occ)
+                elif ptype == ROOK:
+                    targets = rook_attacks(frm, occ)
+                else:
+                    targets = bishop_attacks(frm, occ) | rook_attacks(frm, occ)
+                targets &= not_own
+                while targets:
+                    t = targets & -targets
+                    targets ^= t
+                    add(frm | (t.bit_length() - 1) << 6)
+
+        # castling, only the "not through check" part is tested here
+        if self.castling:
+            if us == WHITE:
+                if self.castling & 1 and not occ & 0x60 and not self._any_attacked((4, 5, 6), them, occ):
+                    add(encode_move(4, 6, 0, CASTLE))
+                if self.castling & 2 and not occ & 0x0E and not self._any_attacked((4, 3, 2), them, occ):
+                    add(encode_move(4, 2, 0, CASTLE))
+            else:
+                if self.castling & 4 and not occ & (0x60 << 56) and not self._any_attacked((60, 61, 62), them, occ):
+                    add(encode_move(60, 62, 0, CASTLE))
+                if self.castling & 8 and not occ & (0x0E << 56) and not self._any_attacked((60, 59, 58), them, occ):
+                    add(encode_move(60, 58, 0, CASTLE))
+        return moves
+
+    def _any_attacked(self, squares, color, occ):
+        for sq in squares:
+            if self.attackers(sq, color, occ):
+                return True
+        return False
+
+    def _pinned(self, ksq, us, occ):
+        them = us ^ 1
+        bbs = self.bbs
+        own = self.occ[us]
+        pinned = 0
+        rq = bbs[them * 6 + ROOK] | bbs[them * 6 + QUEEN]
+        bq = bbs[them * 6 + BISHOP] | bbs[them * 6 + QUEEN]
+        blockers = rook_attacks(ksq, occ) & own
+        pinners = rook_attacks(ksq, occ ^ blockers) & rq
+        while pinners:
+            p = pinners & -pinners
+            pinners ^= p
+            pinned |= BETWEEN[ksq][p.bit_length() - 1] & own
+        blockers = bishop_attacks(ksq, occ) & own
+        pinners = bishop_attacks(ksq, occ ^ blockers) & bq
+        while pinners:
+            p = pinners & -pinners
+            pinners ^= p
+            pinned |= BETWEEN[ksq][p.bit_length() - 1] & own
+        return pinned
+
+    def _is_safe(self, move, ksq, occ):
+        # Would our king be attacked after this move? Simulates just the occupancy.
+        us, them = self.turn, self.turn ^ 1
+        frm, to = move & 63, (move >> 6) & 63
+        captured = 1 << to
+        new_occ = (occ & ~(1 << frm)) | captured
+        if move >> 15 == EN_PASSANT:
+            captured = 1 << (to - 8 if us == WHITE else to + 8)
+            new_occ &= ~captured
+        if frm == ksq:
+            ksq = to
+        bbs = self.bbs
+        o = them * 6
+        keep = ~captured
+        return not ((KNIGHT_ATTACKS[ksq] & bbs[o + KNIGHT] & keep)
+                    or (KING_ATTACKS[ksq] & bbs[o + KING])
+                    or (PAWN_ATTACKS[us][ksq] & bbs[o + PAWN] & keep)
+                    or (bishop_attacks(ksq, new_occ) & (bbs[o + BISHOP] | bbs[o + QUEEN]) & keep)
+                    or (rook_attacks(ksq, new_occ) & (bbs[o + ROOK] | bbs[o + QUEEN]) & keep))
+
+    def legal_moves(self):
+        us = self.turn
+        occ = self.occ[0] | self.occ[1]
+        ksq = self.king_square(us)
+        checked = self.attackers(ksq, us ^ 1, occ)
+        pinned = self._pinned(ksq, us, occ)
+        is_safe = self._is_safe
+        legal = []
+        for move in self.pseudo_moves():
+            frm = move & 63
+            # Only king moves, pinned pieces, en passant and check evasions can expose the king
+            if checked or frm == ksq or (pinned >> frm) & 1 or move >> 15 == EN_PASSANT:
+                if not is_safe(move, ksq, occ):
+                    continue
+            legal.append(move)
+        return legal
+
+    def find_move(self, frm, to, promotion=None):
+        # Resolve a (from, to, promotion) request such as ('e7', 'e8', 'q') to a legal move
+        # These come straight from a JSON body, so anything can turn up here
+        if not isinstance(frm, str) or not isinstance(to, str) or frm not in SQUARES or to not in SQUARES:
+            raise IllegalMove('unknown square')
+        frm, to = SQUARES[frm], SQUARES[to]
+        if promotion is not None and not isinstance(promotion, str):
+            raise IllegalMove('bad promotion piece')
+        promo = PROMOTION_CHARS.get((promotion or 'q').lower())
+        if promo is None:
+            raise IllegalMove('bad promotion piece')
+        candidates = [m for m in self.legal_moves() if m & 63 == frm and (m >> 6) & 63 == to]
+        if not candidates:
+            raise IllegalMove('%s%s is not legal here' % (SQUARE_NAMES[frm], SQUARE_NAMES[to]))
+        for move in candidates:
+            if (move >> 12) & 7 in (0, promo):
+                return move
+        raise IllegalMove('bad promotion piece')
+
+    # --- making moves ---
+    def push(self, move):
+        frm, to = move & 63, (move >> 6) & 63
+        promo, flag = (move >> 12) & 7, move >> 15
+        us = self.turn
+        board, bbs, occ = self.board, self.bbs, self.occ
+        piece = board[frm]
+        captured = board[to]
+        self._stack.append((move, captured, self.castling, self.ep, self.halfmove, self.hash))
+        h = self.hash ^ self._ep_key() ^ ZOBRIST_CASTLE[self.castling] ^ ZOBRIST_BLACK
+
+        from_to = 1 << frm | 1 << to
+        if captured >= 0:
+            bbs[captured] ^= 1 << to
+            occ[us ^ 1] ^= 1 << to
+            h ^= ZOBRIST_PIECE[captured][to]
+        elif flag == EN_PASSANT:
+            cap_sq = to - 8 if us == WHITE else to + 8
+            pawn = (us ^ 1) * 6 + PAWN
+            bbs[pawn] ^= 1 << cap_sq
+            occ[us ^ 1] ^= 1 << cap_sq
+            board[cap_sq] = -1
+            h ^= ZOBRIST_PIECE[pawn][cap_sq]
+        bbs[piece] ^= from_to
+        occ[us] ^= from_to
+        board[frm] = -1
+        board[to] = piece
+        h ^= ZOBRIST_PIECE[piece][frm]
+        if promo:
+            bbs[piece] ^= 1 << to
+            board[to] = us * 6 + promo
+            bbs[us * 6 + promo] ^= 1 << to
+            h ^= ZOBRIST_PIECE[us * 6 + promo][to]
+        else:
+            h ^= ZOBRIST_PIECE[piece][to]
+        if flag == CASTLE:
+            rfrom, rto = CASTLE_ROOK[to]
+            rook = us * 6 + ROOK
+            bbs[rook] ^= 1 << rfrom | 1 << rto
+            occ[us] ^= 1 << rfrom | 1 << rto
+            board[rfrom] = -1
+            board[rto] = rook
+            h ^= ZOBRIST_PIECE[rook][rfrom] ^ ZOBRIST_PIECE[rook][rto]
+
+        self.castling &= CASTLE_MASK[frm] & CASTLE_MASK[to]
+        self.ep = (frm + to) >> 1 if flag == DOUBLE_PUSH else -1
+        if piece % 6 == PAWN or captured >= 0:
+            self.halfmove = 0
+        else:
+            self.halfmove += 1
+        if us == BLACK:
+            self.fullmove += 1
+        self.turn = us ^ 1
+        self.hash = h ^ ZOBRIST_CASTLE[self.castling] ^ self._ep_key()
+
+    def pop(self):
+        move, captured, self.castling, self.ep, self.halfmove, self.hash = self._stack.pop()
+        frm, to = move & 63, (move >> 6) & 63
+        promo, flag = (move >> 12) & 7, move >> 15
+        self.turn = us = self.turn ^ 1
+        if us == BLACK:
+            self.fullmove -= 1
+        board, bbs, occ = self.board, self.bbs, self.occ
+        piece = board[to]
+        if promo:
+            bbs[piece] ^= 1 << to
+            piece = us * 6 + PAWN
+            bbs[piece] ^= 1 << to
+        from_to = 1 << frm | 1 << to
+        bbs[piece] ^= from_to
+        occ[us] ^= from_to
+        board[frm] = piece
+        board[to] = captured
+        if captured >= 0:
+            bbs[captured] ^= 1 << to
+            occ[us ^ 1] ^= 1 << to
+        elif flag == EN_PASSANT:
+            cap_sq = to - 8 if us == WHITE else to + 8
+            pawn = (us ^ 1) * 6 + PAWN
+            bbs[pawn] ^= 1 << cap_sq
+            occ[us ^ 1] ^= 1 << cap_sq
+            board[cap_sq] = pawn
+        if flag == CASTLE:
+            rfrom, rto = CASTLE_ROOK[to]
+            rook = us * 6 + ROOK
+            bbs[rook] ^= 1 << rfrom | 1 << rto
+            occ[us] ^= 1 << rfrom | 1 << rto
+            board[rto] = -1
+            board[rfrom] = rook
+
+    # --- game end ---
+    def insufficient_material(self):
+        bbs = self.bbs
+        if bbs[PAWN] | bbs[6 + PAWN] | bbs[ROOK] | bbs[6 + ROOK] | bbs[QUEEN] | bbs[6 + QUEEN]:
+            return False
+        minors = bbs[KNIGHT] | bbs[6 + KNIGHT] | bbs[BISHOP] | bbs[6 + BISHOP]
+        if bin(minors).count('1') <= 1:
+            return True
+        # Only bishops, all on the same colour of square
+        light = 0x55AA55AA55AA55AA
+        return not (bbs[KNIGHT] | bbs[6 + KNIGHT]) and (not minors & light or not minors & ~light)
+
+    def outcome(self):
+        # 'checkmate', 'stalemate' or 'draw' once the game is over, otherwise None
+        if not self.legal_moves():
+            return 'checkmate' if self.in_check() else 'stalemate'
+        if self.halfmove >= 100 or self.insufficient_material():
+            return 'draw'
+        return None
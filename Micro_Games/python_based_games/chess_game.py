@@ -1,35 +1,654 @@
 import sqlite3
 import os
-from flask import Flask, render_template_string, request, session, redirect, url_for, jsonify
+import json
+import queue
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from flask import Flask, Response, render_template, request, session, redirect, url_for, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
+from chess_engine import Position, IllegalMove, START_FEN, build_tables, move_uci, SQUARES, SQUARE_NAMES, PIECE_CHARS, PROMOTION_CHARS
+import chess_ai
 
 app = Flask(__name__)
 app.secret_key = 'super_secret_termux_key'
-DB_NAME = 'chess_v3.db'  # Changed to v3 to ensure clean start
+# Next to this file by default, so the server finds its games whatever directory it's started from
+DB_NAME = os.environ.get('CHESS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chess_v3.db'))  # Changed to v3 to ensure clean start
+DB_POOL_SIZE = int(os.environ.get('CHESS_DB_POOL_SIZE', 8))
+DB_BUSY_TIMEOUT_MS = 5000
+DB_MMAP_SIZE = 64 * 1024 * 1024
+GAME_CACHE_SIZE = int(os.environ.get('CHESS_GAME_CACHE_SIZE', 1024))
+LOBBY_PAGE_SIZE = 20
+STATES_BATCH_LIMIT = 100  # most games one /api/states request may ask about
+GAME_IDLE_SECONDS = 30 * 60  # an untouched game this old is first in line for eviction
+HASH_WORKERS = int(os.environ.get('CHESS_HASH_WORKERS', min(4, os.cpu_count() or 1)))  # 0 hashes inline
+HASH_QUEUE_LIMIT = int(os.environ.get('CHESS_HASH_QUEUE_LIMIT', 16))  # pending hashes before "busy"
+HASH_METHOD = os.environ.get('CHESS_HASH_METHOD', 'scrypt:32768:8:1')  # or e.g. 'pbkdf2:sha256:600000'
+ARCHIVE_INTERVAL = int(os.environ.get('CHESS_ARCHIVE_INTERVAL', 600))  # seconds between archive runs, 0 disables
+ARCHIVE_IDLE_HOURS = float(os.environ.get('CHESS_ARCHIVE_IDLE_HOURS', 24))  # no move for this long = abandoned
+ARCHIVE_FINISHED_HOURS = float(os.environ.get('CHESS_ARCHIVE_FINISHED_HOURS', 1))  # finished games stay live this long
+ARCHIVE_BATCH = 200  # games per transaction, keeps each write lock short
+AI_WORKERS = int(os.environ.get('CHESS_AI_WORKERS', 1))  # search processes, 0 searches on a thread instead
+AI_MOVE_SECONDS = float(os.environ.get('CHESS_AI_MOVE_SECONDS', 2.0))  # hard limit per computer move
+AI_USERNAME = '@computer'
 
 # --- DATABASE SETUP ---
-def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS users 
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                      username TEXT UNIQUE, 
-                      password TEXT)''')
-        c.execute('''CREATE TABLE IF NOT EXISTS games 
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                      white_id INTEGER, 
-                      black_id INTEGER, 
-                      fen TEXT, 
-                      turn TEXT, 
-                      status TEXT)''')
-        conn.commit()
+class ConnectionPool:
+    # A fixed number of connections shared by all request threads.
+    # Connections are opened lazily and handed out most-recently-used first. setup(conn)
+    # runs once on the very first connection, before any other caller gets one.
+    def __init__(self, path, size, setup=None):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._setup = setup
+        self._ready = setup is None
+        self._setup_lock = threading.Lock()
+        # Contention counters for /api/stats: borrows that had to wait for a free
+        # connection, and SQLite "database is locked" errors that got past busy_timeout
+        self.borrows = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.locked_errors = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # WAL lets the /api/state readers run while a move is being written
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=%d" % DB_BUSY_TIMEOUT_MS)
+        conn.execute("PRAGMA mmap_size=%d" % DB_MMAP_SIZE)
+        return conn
+
+    def _prepare(self):
+        with self._setup_lock:
+            if self._ready:
+                return
+            conn = self._connect()
+            try:
+                self._setup(conn)
+            except Exception:
+                conn.close()
+                raise
+            with self._lock:
+                self._opened += 1
+            self._idle.put(conn)
+            self._ready = True
+
+    def warm_up(self):
+        # Open the first connection (and so run setup) now instead of on first use
+        if not self._ready:
+            self._prepare()
+
+    def acquire(self):
+        if not self._ready:
+            self._prepare()
+        self.borrows += 1  # unlocked, good enough for a counter
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        start = time.perf_counter()
+        conn = self._idle.get()
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += time.perf_counter() - start
+        return conn
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e):
+                with self._lock:
+                    self.locked_errors += 1
+            raise
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        return {'size': self.size, 'open': self._opened, 'borrows': self.borrows, 'waits': self.waits,
+                'wait_ms': round(self.wait_seconds * 1000, 1), 'locked_errors': self.locked_errors}
+
+    def close_all(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._opened -= 1
+
+def add_column(conn, table, column, decl):
+    # Bring databases created by older versions up to the current schema
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(%s)" % table)]
+    if column not in columns:
+        conn.execute("ALTER TABLE %s ADD COLUMN %s %s" % (table, column, decl))
+        return True
+    return False
+
+def init_db(conn):
+    # Schema setup, run by db_pool on its first connection rather than at import so
+    # loading the module costs no database I/O
+    global AI_USER_ID
+    # Let the archiver hand freed pages back to the OS. Switching an existing
+    # file over needs one full VACUUM, after that it is incremental.
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS users 
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                  username TEXT UNIQUE, 
+                  password TEXT)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS games 
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                  white_id INTEGER, 
+                  black_id INTEGER, 
+                  fen TEXT, 
+                  turn TEXT, 
+                  status TEXT,
+                  ply INTEGER NOT NULL DEFAULT 0,
+                  version INTEGER NOT NULL DEFAULT 0,
+                  updated_at INTEGER NOT NULL DEFAULT 0,
+                  ai_depth INTEGER,
+                  ai_nps INTEGER)''')
+    add_column(conn, 'games', 'ply', 'INTEGER NOT NULL DEFAULT 0')
+    # Bumped by every write to a game row, clients use it as an ETag
+    add_column(conn, 'games', 'version', 'INTEGER NOT NULL DEFAULT 0')
+    # Unix time of the last write, the archiver uses it to spot abandoned games
+    if add_column(conn, 'games', 'updated_at', 'INTEGER NOT NULL DEFAULT 0'):
+        c.execute("UPDATE games SET updated_at = ?", (int(time.time()),))
+    # How hard the computer looked for its last move, shown on the board
+    add_column(conn, 'games', 'ai_depth', 'INTEGER')
+    add_column(conn, 'games', 'ai_nps', 'INTEGER')
+    # The computer opponent is an ordinary user row nobody can log in as
+    c.execute("INSERT OR IGNORE INTO users (username, password) VALUES (?, '!')", (AI_USERNAME,))
+    # One row per position reached, ply 0 being the start. hash is the Zobrist key of
+    # the position after the move, so a repetition check is one lookup on idx_moves_hash.
+    c.execute('''CREATE TABLE IF NOT EXISTS moves
+                 (game_id INTEGER NOT NULL,
+                  ply INTEGER NOT NULL,
+                  uci TEXT,
+                  fen TEXT NOT NULL,
+                  hash INTEGER NOT NULL,
+                  PRIMARY KEY (game_id, ply)) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_moves_hash ON moves (game_id, hash)")
+    # Lobby lookups: open games by status (walked by id), and each player's own games
+    c.execute("CREATE INDEX IF NOT EXISTS idx_games_status ON games (status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_games_white ON games (white_id, status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_games_black ON games (black_id, status)")
+    # Finished and abandoned games, moved out of the hot tables by archive_games()
+    c.execute('''CREATE TABLE IF NOT EXISTS games_archive
+                 (id INTEGER PRIMARY KEY,
+                  white_id INTEGER,
+                  black_id INTEGER,
+                  status TEXT,
+                  start_fen TEXT,
+                  final_fen TEXT,
+                  ply INTEGER,
+                  moves BLOB,
+                  updated_at INTEGER,
+                  archived_at INTEGER)''')
+    # The live row's version, so a board open across the archive run keeps its ETag
+    add_column(conn, 'games_archive', 'version', 'INTEGER NOT NULL DEFAULT 0')
+    conn.commit()
+    AI_USER_ID = conn.execute("SELECT id FROM users WHERE username = ?", (AI_USERNAME,)).fetchone()[0]
+
+db_pool = ConnectionPool(DB_NAME, DB_POOL_SIZE, setup=init_db)
+AI_USER_ID = None  # set by init_db()
+
+# --- HOT GAME CACHE ---
+# Boards are read every second but written a few times a minute, so the rows of
+# active games are kept in memory. Every write goes to SQLite first and then
+# replaces the cached row, so the cache never holds anything the DB doesn't.
+GAME_COLUMNS = 'id, white_id, black_id, fen, turn, status, ply, version, ai_depth, ai_nps'
+OPEN_STATUSES = ('waiting', 'active')
+
+class GameCache:
+    def __init__(self, size):
+        self.size = size
+        self._games = OrderedDict()  # game_id -> row dict, least recently used first
+        self._touched = {}  # game_id -> time.monotonic() of the last read or write
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, game_id):
+        with self._lock:
+            game = self._games.get(game_id)
+            if game is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._games.move_to_end(game_id)
+            self._touched[game_id] = time.monotonic()
+            return game
+
+    def put(self, game):
+        game_id = game['id']
+        with self._lock:
+            # Two writers can finish out of order, never let an older row win
+            cached = self._games.get(game_id)
+            if cached is not None and cached['version'] > game['version']:
+                return
+            self._games[game_id] = game
+            self._games.move_to_end(game_id)
+            self._touched[game_id] = time.monotonic()
+            while len(self._games) > self.size:
+                self._evict_one()
+
+    def invalidate(self, game_id):
+        with self._lock:
+            if self._games.pop(game_id, None) is not None:
+                del self._touched[game_id]
+
+    def _evict_one(self):
+        # Prefer a finished or idle game among the oldest entries, else plain LRU
+        now = time.monotonic()
+        victim = None
+        for i, (game_id, game) in enumerate(self._games.items()):
+            if i >= 32:
+                break
+            if game['status'] not in OPEN_STATUSES or now - self._touched[game_id] > GAME_IDLE_SECONDS:
+                victim = game_id
+                break
+        if victim is None:
+            victim = next(iter(self._games))
+        del self._games[victim]
+        del self._touched[victim]
+        self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._games), 'capacity': self.size, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': round(self.hits / lookups, 4) if lookups else None}
+
+game_cache = GameCache(GAME_CACHE_SIZE)
+
+def load_game(game_id, conn=None):
+    game = game_cache.get(game_id)
+    if game is not None:
+        return game
+    if conn is None:
+        with db_pool.connection() as conn:
+            row = conn.execute("SELECT %s FROM games WHERE id = ?" % GAME_COLUMNS, (game_id,)).fetchone()
+    else:
+        row = conn.execute("SELECT %s FROM games WHERE id = ?" % GAME_COLUMNS, (game_id,)).fetchone()
+    if row is None:
+        return None
+    game = dict(row)
+    game_cache.put(game)
+    return game
+
+def load_archived_game(game_id):
+    # The final position of an archived game, shaped like a games row
+    with db_pool.connection() as conn:
+        row = conn.execute("SELECT id, white_id, black_id, status, final_fen, ply, version FROM games_archive "
+                           "WHERE id = ?", (game_id,)).fetchone()
+    if row is None:
+        return None
+    return archived_game(row['id'], row['white_id'], row['black_id'], row['status'], row['final_fen'], row['ply'],
+                         row['version'])
+
+def archived_game(game_id, white_id, black_id, status, fen, ply, version):
+    return {'id': game_id, 'white_id': white_id, 'black_id': black_id, 'fen': fen, 'turn': fen.split()[1],
+            'status': status, 'ply': ply, 'version': version, 'ai_depth': None, 'ai_nps': None}
+
+def find_game(game_id):
+    # For pages that only show a game: live ones first, then the archive
+    return load_game(game_id) or load_archived_game(game_id)
+
+def load_games(conn, game_ids):
+    # Cached rows plus one IN (...) query for the rest. Misses are not added to the
+    # cache so that listing the lobby doesn't push the hot boards out.
+    games = {}
+    missing = []
+    for game_id in game_ids:
+        game = game_cache.get(game_id)
+        if game is None:
+            missing.append(game_id)
+        else:
+            games[game_id] = game
+    if missing:
+        rows = conn.execute("SELECT %s FROM games WHERE id IN (%s)" % (GAME_COLUMNS, ','.join('?' * len(missing))),
+                            missing).fetchall()
+        for row in rows:
+            games[row['id']] = dict(row)
+    return [games[game_id] for game_id in game_ids if game_id in games]
+
+def game_state(game):
+    state = {'fen': game['fen'], 'status': game['status'], 'turn': game['turn'], 'ply': game['ply'],
+             'version': game['version']}
+    if game['ai_depth'] is not None:
+        state['ai'] = {'depth': game['ai_depth'], 'nps': game['ai_nps']}
+    return state
+
+# --- PASSWORD HASHING ---
+# Hashing is deliberately CPU heavy, so it runs in worker processes where a burst of
+# logins can't stall the request threads. Once queue_limit hashes are pending the
+# caller gets HashPoolBusy right away and the user is asked to retry.
+class HashPoolBusy(Exception):
+    pass
+
+def process_context():
+    # The worker pools start from request threads, and a child forked while another
+    # thread holds a lock can deadlock on it. Start workers from a fork server instead
+    # (spawn where there is none), like calculator.py's eval workers.
+    import multiprocessing  # a noticeable import, paid for when a pool starts
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+class HashPool:
+    def __init__(self, workers, queue_limit):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._lock = threading.Lock()
+        self._executor = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context())
+            return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashPoolBusy()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            if not self.workers:
+                return fn(*args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def stats(self):
+        return {'workers': self.workers, 'queue_limit': self.queue_limit,
+                'in_flight': self.in_flight, 'rejected': self.rejected}
+
+hash_pool = HashPool(HASH_WORKERS, HASH_QUEUE_LIMIT)
+
+def hash_password(password):
+    return hash_pool.run(generate_password_hash, password, HASH_METHOD)
+
+def verify_password(pw_hash, password):
+    return hash_pool.run(check_password_hash, pw_hash, password)
+
+# --- COMPUTER OPPONENT ---
+# chess_ai.search() is pure CPU, so it runs in its own worker processes and the request
+# that made the human move returns straight away. The reply is played through
+# apply_move() like any other move and reaches the board over the usual stream.
+class AiPool:
+    def __init__(self, workers):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = set()  # game ids with a search running
+        self.searches = 0
+        self.failures = 0
+        self.last = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.workers:
+                    from concurrent.futures import ProcessPoolExecutor
+                    # Workers start fresh rather than forked, so each builds the move tables
+                    # up front instead of inside its first timed search
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context(),
+                                                         initializer=build_tables)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=1)
+            return self._executor
+
+    def submit(self, game_id, callback, *args):
+        # Starts at most one search per game, returns False if one is already running
+        with self._lock:
+            if game_id in self._pending:
+                return False
+            self._pending.add(game_id)
+            self.searches += 1
+        try:
+            future = self._get_executor().submit(chess_ai.search, *args)
+        except Exception:
+            self.finished(game_id, None)
+            raise
+        future.add_done_callback(callback)
+        return True
+
+    def finished(self, game_id, result):
+        with self._lock:
+            self._pending.discard(game_id)
+            if result is None:
+                self.failures += 1
+            else:
+                self.last = result
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'move_seconds': AI_MOVE_SECONDS, 'thinking': len(self._pending),
+                    'searches': self.searches, 'failures': self.failures, 'last': self.last}
+
+ai_pool = AiPool(AI_WORKERS)
+
+def request_ai_move(game):
+    # Start the computer thinking if it is its turn in this game
+    if game['status'] != 'active' or game['fen'].split()[1] != 'b' or game['black_id'] != AI_USER_ID:
+        return False
+    with db_pool.connection() as conn:
+        history = [row[0] for row in conn.execute("SELECT hash FROM moves WHERE game_id = ?", (game['id'],))]
+    game_id = game['id']
+    return ai_pool.submit(game_id, lambda future: ai_move_done(game_id, future),
+                          game['fen'], history, AI_MOVE_SECONDS)
+
+def ai_move_done(game_id, future):
+    try:
+        result = future.result()
+    except Exception as e:
+        print("computer move for game %d failed: %r" % (game_id, e))
+        ai_pool.finished(game_id, None)
+        return
+    uci = result['move']
+    if uci:
+        body, status = apply_move(game_id, AI_USER_ID, {'from': uci[:2], 'to': uci[2:4], 'promotion': uci[4:] or None},
+                                  ai=result)
+        if status != 200:
+            print("computer move %s for game %d rejected: %s" % (uci, game_id, body.get('error')))
+    ai_pool.finished(game_id, result)
+
+# --- ARCHIVE ---
+# Games finished more than ARCHIVE_FINISHED_HOURS ago, and games nobody has moved in for
+# ARCHIVE_IDLE_HOURS, are moved to
+# games_archive with their moves packed into 2 bytes each, then the freed pages are
+# released with an incremental vacuum. Runs in small batches on a background thread.
+archive_report = {}
+
+def pack_moves(ucis):
+    return struct.pack('<%dH' % len(ucis), *(SQUARES[u[:2]] | SQUARES[u[2:4]] << 6 | PROMOTION_CHARS.get(u[4:], 0) << 12
+                                             for u in ucis))
+
+def unpack_moves(data):
+    ucis = []
+    for (m,) in struct.iter_unpack('<H', data or b''):
+        promotion = m >> 12
+        ucis.append(SQUARE_NAMES[m & 63] + SQUARE_NAMES[(m >> 6) & 63] + (PIECE_CHARS[6 + promotion] if promotion else ''))
+    return ucis
+
+def replay_moves(start_fen, ucis):
+    position = Position(start_fen)
+    rows = []
+    for ply, uci in enumerate(ucis, 1):
+        position.push(position.find_move(uci[:2], uci[2:4], uci[4:] or None))
+        rows.append({'ply': ply, 'uci': uci, 'fen': position.fen()})
+    return rows
+
+def archive_games(idle_hours=ARCHIVE_IDLE_HOURS, finished_hours=ARCHIVE_FINISHED_HOURS):
+    cutoff = int(time.time() - idle_hours * 3600)
+    # Players still look at the final position for a while after the game ends
+    finished_cutoff = int(time.time() - finished_hours * 3600)
+    moved = 0
+    with db_pool.connection() as conn:
+        while True:
+            # No index helps "status NOT IN", but after the first run the table only holds live games
+            games = conn.execute("SELECT id, white_id, black_id, status, fen, ply, version, updated_at FROM games "
+                                 "WHERE (status NOT IN ('waiting', 'active') AND updated_at < ?) OR updated_at < ? "
+                                 "LIMIT ?", (finished_cutoff, cutoff, ARCHIVE_BATCH)).fetchall()
+            if not games:
+                break
+            ids = [game['id'] for game in games]
+            archived = []
+            for game in games:
+                history = conn.execute("SELECT ply, uci, fen FROM moves WHERE game_id = ? ORDER BY ply",
+                                       (game['id'],)).fetchall()
+                start_fen = history[0]['fen'] if history and history[0]['ply'] == 0 else game['fen']
+                ucis = [row['uci'] for row in history if row['ply'] > 0]
+                status = 'abandoned' if game['status'] in OPEN_STATUSES else game['status']
+                # A new status is a new state, boards holding the old ETag must not get a 304
+                version = game['version'] + (status != game['status'])
+                conn.execute("INSERT OR REPLACE INTO games_archive (id, white_id, black_id, status, start_fen, "
+                             "final_fen, ply, moves, updated_at, archived_at, version) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (game['id'], game['white_id'], game['black_id'], status, start_fen, game['fen'],
+                              game['ply'], pack_moves(ucis), game['updated_at'], int(time.time()), version))
+                archived.append(archived_game(game['id'], game['white_id'], game['black_id'], status, game['fen'],
+                                              game['ply'], version))
+            marks = ','.join('?' * len(ids))
+            conn.execute("DELETE FROM moves WHERE game_id IN (%s)" % marks, ids)
+            conn.execute("DELETE FROM games WHERE id IN (%s)" % marks, ids)
+            conn.commit()
+            for game in archived:
+                game_cache.invalidate(game['id'])
+                notify_game(game['id'], game_state(game))  # open boards learn the game was abandoned
+            moved += len(ids)
+
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+        pages_after = conn.execute("PRAGMA page_count").fetchone()[0]
+
+    report = {'games_moved': moved, 'bytes_reclaimed': (pages_before - pages_after) * page_size,
+              'db_bytes': pages_after * page_size, 'finished_at': int(time.time())}
+    archive_report.clear()
+    archive_report.update(report)
+    return report
+
+def start_archiver(interval=ARCHIVE_INTERVAL):
+    if interval <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                report = archive_games()
+            except sqlite3.Error as e:
+                print("archive failed: %s" % e)
+                continue
+            if report['games_moved']:
+                print("archived %(games_moved)d games, reclaimed %(bytes_reclaimed)d bytes" % report)
+
+    thread = threading.Thread(target=run, name='chess-archiver', daemon=True)
+    thread.start()
+    return thread
+
+def warm_up():
+    # Importing this module does no I/O and builds no tables; everything the first
+    # requests would otherwise wait for happens here, before the server takes traffic
+    build_tables()
+    db_pool.warm_up()
+    for source in (LOGIN_TEMPLATE, LOBBY_TEMPLATE, GAME_TEMPLATE):
+        compiled(source)
+
+# --- LIVE UPDATES ---
+# Open boards subscribe to their game here instead of polling /api/state every second.
+# Writers call notify_game() after committing, and each stream only forwards real changes.
+STREAM_KEEPALIVE = 15  # seconds between keepalive comments, also how fast dead clients are noticed
+
+subscribers = {}  # game_id -> set of queue.Queue
+subscribers_lock = threading.Lock()
+
+def subscribe(game_id, q=None):
+    # Anything with put_nowait() can subscribe, the asyncio server passes its own queues
+    if q is None:
+        q = queue.Queue(maxsize=8)
+    with subscribers_lock:
+        subscribers.setdefault(game_id, set()).add(q)
+    return q
 
-init_db()
+def unsubscribe(game_id, q):
+    with subscribers_lock:
+        queues = subscribers.get(game_id)
+        if queues:
+            queues.discard(q)
+            if not queues:
+                del subscribers[game_id]
+
+def notify_game(game_id, state):
+    with subscribers_lock:
+        queues = list(subscribers.get(game_id, ()))
+    for q in queues:
+        # A slow client only needs the latest state, so drop whatever it hasn't read yet
+        while True:
+            try:
+                q.put_nowait(state)
+                break
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+def save_game(game):
+    # Called after the SQLite commit: refresh the cache, then wake up the open boards
+    game_cache.put(game)
+    notify_game(game['id'], game_state(game))
 
 # --- HTML TEMPLATES ---
 
@@ -86,32 +705,78 @@ LOBBY_TEMPLATE = """
 <body>
     <div class="header">
         <div>User: <strong>{{ username }}</strong></div>
-        <a href="/logout" class="btn logout">Logout</a>
+        <a href="{{ url_for('logout') }}" class="btn logout">Logout</a>
     </div>
 
-    <form method="POST" action="/create_game">
+    <form method="POST" action="{{ url_for('create_game') }}">
         <button type="submit" class="create">+ Create New Game</button>
+        <button type="submit" name="opponent" value="computer" class="create" style="background:#8e44ad; margin-top:10px;">+ Play vs Computer</button>
     </form>
 
-    <h3>Available Games</h3>
-    {% if not games %} <p style="color:#777">No active games.</p> {% endif %}
-    
-    {% for game in games %}
+    {% macro game_card(game, live=False) %}
+    {% if live %}
+    {% set color = 'w' if game['white_id'] == user_id else 'b' %}
+    <div class="game-card" data-game-id="{{ game['id'] }}" data-version="{{ game['version'] }}" data-color="{{ color }}">
+    {% else %}
     <div class="game-card">
+    {% endif %}
         <div>
             <strong>Game #{{ game['id'] }}</strong> <br>
-            <span style="font-size: 12px; color: #aaa;">{{ game['status'] }}</span>
+            <span class="game-status" style="font-size: 12px; color: #aaa;">{{ game['status'] }}
+                {%- if live and game['status'] == 'active' %} - {{ 'your move' if game['fen'].split()[1] == color else 'their move' }}{% endif %}</span>
         </div>
         
         {% if game['status'] == 'waiting' and game['white_id'] != user_id %}
-            <a href="/join/{{ game['id'] }}" class="join-btn">JOIN</a>
+            <a href="{{ url_for('join_game', game_id=game['id']) }}" class="join-btn">JOIN</a>
         {% elif game['white_id'] == user_id or game['black_id'] == user_id %}
-            <a href="/game/{{ game['id'] }}" class="join-btn" style="background:#e67e22">PLAY</a>
+            <a href="{{ url_for('play_game', game_id=game['id']) }}" class="join-btn" style="background:#e67e22">PLAY</a>
         {% else %}
             <span style="color:#555">Locked</span>
         {% endif %}
     </div>
-    {% endfor %}
+    {% endmacro %}
+
+    <h3>My Games</h3>
+    {% if not my_games %} <p style="color:#777">No active games.</p> {% endif %}
+    {% for game in my_games %}{{ game_card(game, live=True) }}{% endfor %}
+
+    <h3>Open Games</h3>
+    {% if not open_games %} <p style="color:#777">No open games.</p> {% endif %}
+    {% for game in open_games %}{{ game_card(game) }}{% endfor %}
+    {% if next_before %}
+    <a href="{{ url_for('lobby', before=next_before) }}" class="btn" style="display:block; text-align:center; margin-top:10px; color:#aaa;">Older games &rarr;</a>
+    {% endif %}
+
+<script>
+    // Live status for "My Games": one request covers every board, and only the games
+    // whose version moved since the last answer come back
+    function refreshGames() {
+        var cards = document.querySelectorAll('.game-card[data-version]');
+        if (!cards.length || document.hidden) return;
+        var known = {};
+        cards.forEach(function(card) { known[card.dataset.gameId] = +card.dataset.version; });
+        fetch({{ url_for('get_states')|tojson }}, {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({games: known})})
+            .then(function(r) { return r.json(); })
+            .then(function(data) {
+                cards.forEach(function(card) {
+                    var id = card.dataset.gameId;
+                    var label = card.querySelector('.game-status');
+                    if (data.missing.indexOf(+id) !== -1) {
+                        label.textContent = 'archived';
+                        delete card.dataset.version;
+                        return;
+                    }
+                    var state = data.games[id];
+                    if (!state) return;
+                    card.dataset.version = state.version;
+                    label.textContent = state.status;
+                    if (state.status === 'active')
+                        label.textContent += state.fen.split(' ')[1] === card.dataset.color ? ' - your move' : ' - their move';
+                });
+            });
+    }
+    if (window.fetch) setInterval(refreshGames, 2000);
+</script>
 </body>
 </html>
 """
@@ -137,10 +802,11 @@ GAME_TEMPLATE = """
     <div class="status-box">
         <div>You are: <strong style="color: {{ 'white' if is_white else 'orange' }}">{{ 'WHITE' if is_white else 'BLACK' }}</strong></div>
         <div id="status">Connecting...</div>
+        <div id="ai-info" style="font-size: 12px; color: #888;"></div>
     </div>
 
     <div id="board"></div>
-    <a href="/lobby" class="back-btn">← Back to Lobby</a>
+    <a href="{{ url_for('lobby') }}" class="back-btn">← Back to Lobby</a>
 
 <script>
     var board = null;
@@ -163,11 +829,17 @@ GAME_TEMPLATE = """
         if (move === null) return 'snapback';
 
         $.ajax({
-            url: '/api/move/' + gameId,
+            url: {{ url_for('make_move', game_id=game_id)|tojson }},
             type: 'POST',
             contentType: 'application/json',
-            data: JSON.stringify({ fen: game.fen() }),
-            success: function() { isMyTurn = false; updateStatus(); }
+            data: JSON.stringify({ from: move.from, to: move.to, promotion: move.promotion }),
+            success: function() { isMyTurn = false; updateStatus(); },
+            error: function() {
+                // The server rejected the move, put the piece back
+                game.undo();
+                board.position(game.fen());
+                updateStatus();
+            }
         });
     }
 
@@ -197,24 +869,234 @@ GAME_TEMPLATE = """
     }
     board = Chessboard('board', config);
 
-    setInterval(function() {
-        $.get('/api/state/' + gameId, function(data) {
-            if (data.fen !== game.fen()) {
-                game.load(data.fen);
-                board.position(data.fen);
-            }
-            var serverTurn = (game.turn() === 'w') ? 'white' : 'black';
-            isMyTurn = (serverTurn === myColor && data.status === 'active');
-            
-            if(data.status === 'waiting') $('#status').text("Waiting for opponent...");
-            else updateStatus();
-        });
-    }, 1000);
+    function applyState(data) {
+        if (!data.fen) return;
+        if (data.fen !== game.fen()) {
+            game.load(data.fen);
+            board.position(data.fen);
+        }
+        var serverTurn = (game.turn() === 'w') ? 'white' : 'black';
+        isMyTurn = (serverTurn === myColor && data.status === 'active');
+
+        if(data.status === 'waiting') $('#status').text("Waiting for opponent...");
+        else updateStatus();
+        if (data.ai) $('#ai-info').text('Computer searched ' + data.ai.depth + ' ply at ' + data.ai.nps + ' nodes/s');
+    }
+
+    // Polling is only the fallback now, the server pushes changes over /api/stream
+    var pollTimer = null;
+    function startPolling() {
+        if (pollTimer) return;
+        var etag = null;
+        pollTimer = setInterval(function() {
+            // Idle boards get an empty 304 back as long as the version hasn't moved
+            $.ajax({
+                url: {{ url_for('get_state', game_id=game_id)|tojson }},
+                headers: etag ? { 'If-None-Match': etag } : {},
+                success: function(data, textStatus, xhr) {
+                    if (xhr.status === 304) return;
+                    etag = xhr.getResponseHeader('ETag');
+                    applyState(data);
+                },
+                error: function(xhr) {
+                    // The game is gone, asking again every second won't bring it back
+                    if (xhr.status === 404) clearInterval(pollTimer);
+                }
+            });
+        }, 1000);
+    }
+
+    function startEventStream() {
+        if (!window.EventSource) return startPolling();
+        var source = new EventSource({{ url_for('stream_state', game_id=game_id)|tojson }});
+        source.onmessage = function(e) { applyState(JSON.parse(e.data)); };
+        source.onerror = function() {
+            // EventSource reconnects on its own unless the server refused the stream
+            if (source.readyState === EventSource.CLOSED) startPolling();
+        };
+    }
+
+    {% if websocket %}
+    // Served by chess_game_async.py: moves are broadcast over a WebSocket
+    if (window.WebSocket) {
+        var ws = new WebSocket((location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + {{ (request.root_path ~ '/ws/' ~ game_id)|tojson }});
+        ws.onmessage = function(e) { applyState(JSON.parse(e.data)); };
+        ws.onclose = function() { startEventStream(); };
+    } else {
+        startEventStream();
+    }
+    {% else %}
+    startEventStream();
+    {% endif %}
 </script>
 </body>
 </html>
 """
 
+# render_template_string() compiles its source on every call. These are compiled once,
+# by warm_up() or on first use, and the Template objects are reused after that.
+@lru_cache(maxsize=None)
+def compiled(source):
+    return app.jinja_env.from_string(source)
+
+# --- GAME ACTIONS ---
+# Plain functions behind the routes, shared with the asyncio server in chess_game_async.py
+
+def register_user(username, password):
+    # Returns (message, error)
+    hashed_pw = hash_password(password)
+    with db_pool.connection() as conn:
+        try:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_pw))
+            conn.commit()
+        except sqlite3.IntegrityError:
+            return None, "Username already exists!"
+    return "Registration successful! Please login.", None
+
+def authenticate(username, password):
+    with db_pool.connection() as conn:
+        user = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+    if user and verify_password(user['password'], password):
+        return user
+    return None
+
+def lobby_games(user_id, before=None):
+    # Returns (my_games, open_games, next_before)
+    with db_pool.connection() as conn:
+        # The player's own boards are the hot ones, so only their ids come from the index
+        my_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM games WHERE white_id = ? AND status IN ('waiting', 'active') "
+            "UNION SELECT id FROM games WHERE black_id = ? AND status IN ('waiting', 'active') "
+            "ORDER BY id DESC", (user_id, user_id))]
+        my_games = load_games(conn, my_ids)
+
+        # Joinable games, newest first, one page at a time keyed on id
+        open_games = conn.execute(
+            "SELECT id, white_id, black_id, status FROM games "
+            "WHERE status = 'waiting' AND white_id != ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (user_id, before or 2 ** 63 - 1, LOBBY_PAGE_SIZE + 1)).fetchall()
+    next_before = None
+    if len(open_games) > LOBBY_PAGE_SIZE:
+        open_games = open_games[:LOBBY_PAGE_SIZE]
+        next_before = open_games[-1]['id']
+    return my_games, open_games, next_before
+
+def new_game(user_id, vs_computer=False):
+    # Against the computer the game starts straight away, with the computer as black
+    with db_pool.connection() as conn:
+        black_id, status = (AI_USER_ID, 'active') if vs_computer else (None, 'waiting')
+        cur = conn.execute("INSERT INTO games (white_id, black_id, fen, turn, status, updated_at) VALUES (?, ?, ?, 'w', ?, ?)",
+                           (user_id, black_id, START_FEN, status, int(time.time())))
+        conn.execute("INSERT INTO moves (game_id, ply, fen, hash) VALUES (?, 0, ?, ?)",
+                     (cur.lastrowid, START_FEN, Position(START_FEN).hash))
+        conn.commit()
+    save_game({'id': cur.lastrowid, 'white_id': user_id, 'black_id': black_id, 'fen': START_FEN,
+               'turn': 'w', 'status': status, 'ply': 0, 'version': 0, 'ai_depth': None, 'ai_nps': None})
+    return cur.lastrowid
+
+def join(game_id, user_id):
+    game = load_game(game_id)
+    if game and game['status'] == 'waiting' and game['white_id'] != user_id:
+        with db_pool.connection() as conn:
+            cur = conn.execute("UPDATE games SET black_id = ?, status = 'active', version = version + 1, updated_at = ? "
+                               "WHERE id = ? AND version = ?", (user_id, int(time.time()), game_id, game['version']))
+            conn.commit()
+        if cur.rowcount == 1:
+            save_game(dict(game, black_id=user_id, status='active', version=game['version'] + 1))
+        else:
+            game_cache.invalidate(game_id)
+
+def apply_move(game_id, user_id, data, ai=None):
+    # Returns (response body, HTTP status). ai is the chess_ai.search() result for computer moves.
+    with db_pool.connection() as conn:
+        game = load_game(game_id, conn)
+        if not game: return {'error': 'not found'}, 404
+        if game['status'] != 'active': return {'error': 'game is not active'}, 409
+
+        # The server owns the position: apply the requested move to the stored FEN.
+        # Whose turn it is comes from the FEN, older rows never kept the turn column up to date.
+        position = Position(game['fen'])
+        player_id = game['black_id'] if position.turn else game['white_id']
+        if player_id != user_id: return {'error': 'not your turn'}, 409
+
+        try:
+            move = position.find_move(data.get('from'), data.get('to'), data.get('promotion'))
+        except IllegalMove as e:
+            return {'error': str(e)}, 400
+        position.push(move)
+
+        fen = position.fen()
+        turn = 'wb'[position.turn]
+        ply = game['ply'] + 1
+        status = position.outcome()
+        if not status:
+            seen = conn.execute("SELECT COUNT(*) FROM moves WHERE game_id = ? AND hash = ?",
+                                (game_id, position.hash)).fetchone()[0]
+            status = 'draw' if seen >= 2 else 'active'  # threefold repetition
+
+        ai_depth, ai_nps = (ai['depth'], ai['nps']) if ai else (game['ai_depth'], game['ai_nps'])
+        # Only write if nobody else moved since we read the row
+        cur = conn.execute("UPDATE games SET fen = ?, turn = ?, status = ?, ply = ?, version = version + 1, updated_at = ?, "
+                           "ai_depth = ?, ai_nps = ? WHERE id = ? AND version = ?",
+                           (fen, turn, status, ply, int(time.time()), ai_depth, ai_nps, game_id, game['version']))
+        if cur.rowcount != 1:
+            conn.rollback()
+            game_cache.invalidate(game_id)
+            return {'error': 'position changed, reload'}, 409
+        conn.execute("INSERT INTO moves (game_id, ply, uci, fen, hash) VALUES (?, ?, ?, ?, ?)",
+                     (game_id, ply, move_uci(move), fen, position.hash))
+        conn.commit()
+    game = dict(game, fen=fen, turn=turn, status=status, ply=ply, version=game['version'] + 1,
+                ai_depth=ai_depth, ai_nps=ai_nps)
+    save_game(game)
+    request_ai_move(game)
+    return {'success': True, 'fen': fen, 'turn': turn, 'status': status, 'ply': ply}, 200
+
+def changed_states(known):
+    # known maps game id -> the version the client has. Returns the states of the games
+    # that moved on and the ids that no longer exist (archived), with one IN (...) query
+    # for whatever isn't cached.
+    game_ids = list(known)[:STATES_BATCH_LIMIT]
+    with db_pool.connection() as conn:
+        games = {game['id']: game for game in load_games(conn, game_ids)}
+    changed = {game_id: game_state(game) for game_id, game in games.items() if game['version'] != known[game_id]}
+    return {'games': changed, 'missing': [game_id for game_id in game_ids if game_id not in games]}
+
+def parse_known_versions(data):
+    # {"games": {"<id>": <version>, ...}} from the request body, bad entries are skipped
+    known = {}
+    games = data.get('games') if isinstance(data, dict) else None
+    for game_id, version in (games.items() if isinstance(games, dict) else ()):
+        try:
+            known[int(game_id)] = int(version)
+        except (TypeError, ValueError):
+            continue
+    return known
+
+def moves_since(game_id, since):
+    with db_pool.connection() as conn:
+        rows = conn.execute("SELECT ply, uci, fen FROM moves WHERE game_id = ? AND ply > ? ORDER BY ply",
+                            (game_id, since)).fetchall()
+        if not rows:
+            archived = conn.execute("SELECT start_fen, moves FROM games_archive WHERE id = ?", (game_id,)).fetchone()
+            if archived:
+                rows = [r for r in replay_moves(archived['start_fen'], unpack_moves(archived['moves']))
+                        if r['ply'] > since]
+    return {'game_id': game_id, 'since': since,
+            'moves': [{'ply': r['ply'], 'uci': r['uci'], 'fen': r['fen']} for r in rows]}
+
+def state_etag(game):
+    return 'g%d-v%d' % (game['id'], game['version'])
+
+def stats():
+    with subscribers_lock:
+        streams = sum(len(queues) for queues in subscribers.values())
+    return {'db_pool': db_pool.stats(), 'game_cache': game_cache.stats(), 'hash_pool': hash_pool.stats(),
+            'ai_pool': ai_pool.stats(), 'archive': dict(archive_report), 'open_streams': streams}
+
+def same_position(a, b):
+    return a['fen'] == b['fen'] and a['status'] == b['status']
+
 # --- ROUTES ---
 
 @app.route('/', methods=['GET', 'POST'])
@@ -227,32 +1109,24 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
 
-        conn = get_db_connection()
-        c = conn.cursor()
+        try:
+            if action == 'register':
+                msg, error = register_user(username, password)
 
-        if action == 'register':
-            try:
-                hashed_pw = generate_password_hash(password)
-                c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_pw))
-                conn.commit()
-                msg = "Registration successful! Please login."
-            except sqlite3.IntegrityError:
-                error = "Username already exists!"
-        
-        elif action == 'login':
-            user = c.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
-            if user and check_password_hash(user['password'], password):
-                session['user_id'] = user['id']
-                session['username'] = user['username']
-                session.permanent = True
-                conn.close()
-                return redirect(url_for('lobby'))
-            else:
-                error = "Invalid username or password"
-        
-        conn.close()
+            elif action == 'login':
+                user = authenticate(username, password)
+                if user:
+                    session['user_id'] = user['id']
+                    session['username'] = user['username']
+                    session.permanent = True
+                    return redirect(url_for('lobby'))
+                else:
+                    error = "Invalid username or password"
+        except HashPoolBusy:
+            error = "Server is busy, please try again in a moment."
+            return render_template(compiled(LOGIN_TEMPLATE), error=error, msg=msg), 503, {'Retry-After': '1'}
 
-    return render_template_string(LOGIN_TEMPLATE, error=error, msg=msg)
+    return render_template(compiled(LOGIN_TEMPLATE), error=error, msg=msg)
 
 @app.route('/logout')
 def logout():
@@ -263,73 +1137,106 @@ def logout():
 def lobby():
     if 'user_id' not in session: return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    games = conn.execute("SELECT * FROM games WHERE status != 'finished'").fetchall()
-    conn.close()
-    
-    return render_template_string(LOBBY_TEMPLATE, games=games, username=session['username'], user_id=session['user_id'])
+    user_id = session['user_id']
+    my_games, open_games, next_before = lobby_games(user_id, request.args.get('before', type=int))
+    return render_template(compiled(LOBBY_TEMPLATE), my_games=my_games, open_games=open_games, next_before=next_before,
+                                  username=session['username'], user_id=user_id)
 
 @app.route('/create_game', methods=['POST'])
 def create_game():
     if 'user_id' not in session: return redirect(url_for('login'))
     
-    start_fen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
-    conn = get_db_connection()
-    conn.execute("INSERT INTO games (white_id, fen, turn, status) VALUES (?, ?, 'w', 'waiting')", 
-                 (session['user_id'], start_fen))
-    conn.commit()
-    conn.close()
+    if request.form.get('opponent') == 'computer':
+        return redirect(url_for('play_game', game_id=new_game(session['user_id'], vs_computer=True)))
+    new_game(session['user_id'])
     return redirect(url_for('lobby'))
 
 @app.route('/join/<int:game_id>')
 def join_game(game_id):
     if 'user_id' not in session: return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    game = conn.execute("SELECT * FROM games WHERE id = ?", (game_id,)).fetchone()
-    
-    if game and game['status'] == 'waiting' and game['white_id'] != session['user_id']:
-        conn.execute("UPDATE games SET black_id = ?, status = 'active' WHERE id = ?", 
-                     (session['user_id'], game_id))
-        conn.commit()
-    
-    conn.close()
+    join(game_id, session['user_id'])
     return redirect(url_for('play_game', game_id=game_id))
 
 @app.route('/game/<int:game_id>')
 def play_game(game_id):
     if 'user_id' not in session: return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    game = conn.execute("SELECT * FROM games WHERE id = ?", (game_id,)).fetchone()
-    conn.close()
-
-    if not game: return "Game not found"
+    game = find_game(game_id)
+    if not game: return "Game not found", 404
+    request_ai_move(game)  # picks up a computer move lost to a restart
     
     is_white = (game['white_id'] == session['user_id'])
-    return render_template_string(GAME_TEMPLATE, game_id=game_id, is_white=is_white)
+    return render_template(compiled(GAME_TEMPLATE), game_id=game_id, is_white=is_white)
 
 # --- API ---
 @app.route('/api/state/<int:game_id>')
 def get_state(game_id):
-    conn = get_db_connection()
-    game = conn.execute("SELECT fen, status, turn FROM games WHERE id = ?", (game_id,)).fetchone()
-    conn.close()
-    if game:
-        return jsonify({'fen': game['fen'], 'status': game['status'], 'turn': game['turn']})
-    return jsonify({})
+    game = find_game(game_id)
+    if not game:
+        return jsonify({}), 404
+
+    etag = state_etag(game)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(game_state(game))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/states', methods=['POST'])
+def get_states():
+    # Body: {"games": {"<id>": <known version>, ...}}
+    return jsonify(changed_states(parse_known_versions(request.get_json(silent=True))))
+
+@app.route('/api/stream/<int:game_id>')
+def stream_state(game_id):
+    # Subscribe before reading so a move committed in between is not missed
+    q = subscribe(game_id)
+    game = find_game(game_id)
+    if not game:
+        unsubscribe(game_id, q)
+        return jsonify({}), 404
+
+    def events(last):
+        try:
+            yield 'retry: 3000\ndata: %s\n\n' % json.dumps(last)
+            while True:
+                try:
+                    state = q.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if same_position(state, last):
+                    continue
+                last = state
+                yield 'data: %s\n\n' % json.dumps(state)
+        finally:
+            unsubscribe(game_id, q)
+
+    return Response(events(game_state(game)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/move/<int:game_id>', methods=['POST'])
 def make_move(game_id):
     if 'user_id' not in session: return jsonify({'error': 'auth'}), 403
     
-    data = request.json
-    conn = get_db_connection()
-    conn.execute("UPDATE games SET fen = ? WHERE id = ?", (data['fen'], game_id))
-    conn.commit()
-    conn.close()
-    return jsonify({'success': True})
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict): return jsonify({'error': 'expected a JSON object'}), 400
+    body, status = apply_move(game_id, session['user_id'], data)
+    return jsonify(body), status
+
+@app.route('/api/moves/<int:game_id>')
+def get_moves(game_id):
+    # Moves after ?since=<ply>, so a client that knows its last ply can catch up cheaply
+    return jsonify(moves_since(game_id, request.args.get('since', 0, type=int)))
+
+@app.route('/api/stats')
+def server_stats():
+    return jsonify(stats())
 
 if __name__ == '__main__':
+    warm_up()
+    start_archiver()
     app.run(host='0.0.0.0', port=5000)
-
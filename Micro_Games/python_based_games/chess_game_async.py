@@ -0,0 +1,223 @@
+# asyncio (ASGI) version of chess_game.py, built on Quart.
+# Same routes, templates, database and cache as the Flask app; the game logic is the
+# shared functions in chess_game.py. Anything that can touch SQLite or hash a password
+# runs on a worker thread, so the event loop only ever waits on sockets and an idle
+# board costs a coroutine instead of a thread.
+#
+#   pip install quart
+#   python chess_game_async.py                           # development server on :5000
+#   hypercorn chess_game_async:app --bind 0.0.0.0:5000   # or any ASGI server
+import asyncio
+import json
+from functools import lru_cache
+
+from quart import Quart, Response, render_template, request, session, redirect, url_for, jsonify, websocket
+
+import chess_game as core
+from chess_game import LOGIN_TEMPLATE, LOBBY_TEMPLATE, GAME_TEMPLATE, HashPoolBusy
+
+app = Quart(__name__)
+app.secret_key = core.app.secret_key  # sessions work across both servers
+
+
+async def db(fn, *args):
+    # The non-blocking access layer: run a blocking chess_game call on the default executor
+    return await asyncio.to_thread(fn, *args)
+
+
+class LoopQueue:
+    # Stands in for queue.Queue in chess_game's subscriber registry. notify_game() runs
+    # on worker threads, so states are handed to the event loop thread-safely and a slow
+    # client only keeps the latest one.
+    def __init__(self, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=1)
+
+    def put_nowait(self, state):
+        self._loop.call_soon_threadsafe(self._deliver, state)
+
+    def _deliver(self, state):
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(state)
+
+    async def get(self):
+        return await self._queue.get()
+
+
+@lru_cache(maxsize=None)
+def compiled(source):
+    # Quart has its own (async) Jinja environment, so the shared templates are compiled
+    # for it separately, once each
+    return app.jinja_env.from_string(source)
+
+@app.before_serving
+async def start_background_jobs():
+    await db(core.warm_up)
+    for source in (LOGIN_TEMPLATE, LOBBY_TEMPLATE, GAME_TEMPLATE):
+        compiled(source)
+    core.start_archiver()
+
+# --- ROUTES ---
+
+@app.route('/', methods=['GET', 'POST'])
+async def login():
+    msg = None
+    error = None
+
+    if request.method == 'POST':
+        form = await request.form
+        action = form.get('action')
+        username = form.get('username')
+        password = form.get('password')
+
+        try:
+            if action == 'register':
+                msg, error = await db(core.register_user, username, password)
+
+            elif action == 'login':
+                user = await db(core.authenticate, username, password)
+                if user:
+                    session['user_id'] = user['id']
+                    session['username'] = user['username']
+                    session.permanent = True
+                    return redirect(url_for('lobby'))
+                else:
+                    error = "Invalid username or password"
+        except HashPoolBusy:
+            error = "Server is busy, please try again in a moment."
+            return await render_template(compiled(LOGIN_TEMPLATE), error=error, msg=msg), 503, {'Retry-After': '1'}
+
+    return await render_template(compiled(LOGIN_TEMPLATE), error=error, msg=msg)
+
+@app.route('/logout')
+async def logout():
+    session.clear()
+    return redirect(url_for('login'))
+
+@app.route('/lobby')
+async def lobby():
+    if 'user_id' not in session: return redirect(url_for('login'))
+
+    user_id = session['user_id']
+    my_games, open_games, next_before = await db(core.lobby_games, user_id, request.args.get('before', type=int))
+    return await render_template(compiled(LOBBY_TEMPLATE), my_games=my_games, open_games=open_games,
+                                 next_before=next_before, username=session['username'], user_id=user_id)
+
+@app.route('/create_game', methods=['POST'])
+async def create_game():
+    if 'user_id' not in session: return redirect(url_for('login'))
+
+    form = await request.form
+    if form.get('opponent') == 'computer':
+        return redirect(url_for('play_game', game_id=await db(core.new_game, session['user_id'], True)))
+    await db(core.new_game, session['user_id'])
+    return redirect(url_for('lobby'))
+
+@app.route('/join/<int:game_id>')
+async def join_game(game_id):
+    if 'user_id' not in session: return redirect(url_for('login'))
+
+    await db(core.join, game_id, session['user_id'])
+    return redirect(url_for('play_game', game_id=game_id))
+
+@app.route('/game/<int:game_id>')
+async def play_game(game_id):
+    if 'user_id' not in session: return redirect(url_for('login'))
+
+    game = await db(core.find_game, game_id)
+    if not game: return "Game not found", 404
+    await db(core.request_ai_move, game)
+
+    is_white = (game['white_id'] == session['user_id'])
+    return await render_template(compiled(GAME_TEMPLATE), game_id=game_id, is_white=is_white, websocket=True)
+
+# --- API ---
+@app.route('/api/state/<int:game_id>')
+async def get_state(game_id):
+    game = await db(core.find_game, game_id)
+    if not game:
+        return jsonify({}), 404
+
+    etag = core.state_etag(game)
+    if etag in request.if_none_match:
+        response = Response('', status=304)
+    else:
+        response = jsonify(core.game_state(game))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/states', methods=['POST'])
+async def get_states():
+    known = core.parse_known_versions(await request.get_json(silent=True))
+    return jsonify(await db(core.changed_states, known))
+
+@app.route('/api/stream/<int:game_id>')
+async def stream_state(game_id):
+    q = core.subscribe(game_id, LoopQueue(asyncio.get_running_loop()))
+    game = await db(core.find_game, game_id)
+    if not game:
+        core.unsubscribe(game_id, q)
+        return jsonify({}), 404
+
+    async def events(last):
+        try:
+            yield ('retry: 3000\ndata: %s\n\n' % json.dumps(last)).encode()
+            while True:
+                try:
+                    state = await asyncio.wait_for(q.get(), core.STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+                    continue
+                if core.same_position(state, last):
+                    continue
+                last = state
+                yield ('data: %s\n\n' % json.dumps(state)).encode()
+        finally:
+            core.unsubscribe(game_id, q)
+
+    response = Response(events(core.game_state(game)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # streams stay open for as long as the board does
+    return response
+
+@app.websocket('/ws/<int:game_id>')
+async def game_socket(game_id):
+    # Pushes the game state on connect and after every change; moves still go to /api/move
+    q = core.subscribe(game_id, LoopQueue(asyncio.get_running_loop()))
+    try:
+        game = await db(core.find_game, game_id)
+        if not game:
+            await websocket.close(1008)
+            return
+        last = core.game_state(game)
+        await websocket.send(json.dumps(last))
+        while True:
+            state = await q.get()
+            if core.same_position(state, last):
+                continue
+            last = state
+            await websocket.send(json.dumps(state))
+    finally:
+        core.unsubscribe(game_id, q)
+
+@app.route('/api/move/<int:game_id>', methods=['POST'])
+async def make_move(game_id):
+    if 'user_id' not in session: return jsonify({'error': 'auth'}), 403
+
+    data = await request.get_json(silent=True)
+    if not isinstance(data, dict): return jsonify({'error': 'expected a JSON object'}), 400
+    body, status = await db(core.apply_move, game_id, session['user_id'], data)
+    return jsonify(body), status
+
+@app.route('/api/moves/<int:game_id>')
+async def get_moves(game_id):
+    return jsonify(await db(core.moves_since, game_id, request.args.get('since', 0, type=int)))
+
+@app.route('/api/stats')
+async def server_stats():
+    return jsonify(core.stats())
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
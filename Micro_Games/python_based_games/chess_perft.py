@@ -0,0 +1,107 @@
+# Perft runner for chess_engine.py.
+# Counts leaf nodes of the legal move tree for the standard test positions, checks them
+# against the published numbers and reports nodes/sec so move generator speed can be
+# compared between releases.
+#
+#   python chess_perft.py                      # every position, depth 3
+#   python chess_perft.py -d 4 -p start kiwipete --json perft.json
+import argparse
+import json
+import platform
+import sys
+import time
+
+from chess_engine import Position, START_FEN
+
+# name -> (fen, known node counts for depth 1, 2, 3, ...)
+POSITIONS = {
+    'start': (START_FEN,
+              [20, 400, 8902, 197281, 4865609, 119060324]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                 [48, 2039, 97862, 4085603, 193690690]),
+    'endgame': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                [14, 191, 2812, 43238, 674624, 11030083]),
+    'promotions': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                   [6, 264, 9467, 422333, 15833292]),
+    'talkchess': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                  [44, 1486, 62379, 2103487, 89941194]),
+    'middlegame': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                   [46, 2079, 89890, 3894594, 164075551]),
+}
+
+
+def perft(position, depth):
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.push(move)
+        nodes += perft(position, depth - 1)
+        position.pop()
+    return nodes
+
+
+def run_position(name, depth):
+    fen, known = POSITIONS[name]
+    position = Position(fen)
+    start = time.perf_counter()
+    nodes = perft(position, depth) if depth > 0 else 1
+    seconds = time.perf_counter() - start
+    expected = known[depth - 1] if 0 < depth <= len(known) else None
+    return {
+        'name': name,
+        'fen': fen,
+        'depth': depth,
+        'nodes': nodes,
+        'expected': expected,
+        'ok': expected is None or nodes == expected,
+        'seconds': round(seconds, 4),
+        'nps': int(nodes / seconds) if seconds > 0 else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perft benchmark for chess_engine.py')
+    parser.add_argument('-d', '--depth', type=int, default=3, help='search depth (default: 3)')
+    parser.add_argument('-p', '--positions', nargs='+', choices=sorted(POSITIONS), default=list(POSITIONS),
+                        help='positions to run (default: all)')
+    parser.add_argument('--json', metavar='PATH', help="write machine-readable results here ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.positions:
+        result = run_position(name, args.depth)
+        results.append(result)
+        if args.json != '-':
+            mark = '?' if result['expected'] is None else ('ok' if result['ok'] else 'FAIL')
+            print('%-11s depth %d  %12d nodes  %8.3fs  %9s nps  %s'
+                  % (name, args.depth, result['nodes'], result['seconds'], result['nps'] or '-', mark))
+
+    total_nodes = sum(r['nodes'] for r in results)
+    total_seconds = sum(r['seconds'] for r in results)
+    report = {
+        'depth': args.depth,
+        'python': platform.python_implementation() + ' ' + platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'total_nodes': total_nodes,
+        'total_seconds': round(total_seconds, 4),
+        'nps': int(total_nodes / total_seconds) if total_seconds > 0 else None,
+        'ok': all(r['ok'] for r in results),
+        'results': results,
+    }
+
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print('total       %d nodes in %.3fs, %s nps' % (total_nodes, total_seconds, report['nps']))
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
+    return 0 if report['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
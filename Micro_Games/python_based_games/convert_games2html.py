@@ -1,12 +1,33 @@
+import argparse
+import ast
+import hashlib
+import json
 import os
 import re
 
 # --- CONFIGURATION ---
-# We use '..' to point to the parent directory (the folder containing 'python_based_games')
-PARENT_DIR = ".." 
+# Paths are relative to this script, so it can be run from anywhere.
+# '..' is the parent directory (the folder containing 'python_based_games')
+HERE = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.join(HERE, "..")
+
+# What each game module was parsed into last time, keyed by file name. A module whose
+# mtime (or, failing that, content hash) is unchanged is not parsed again, and pages whose
+# content is unchanged are not rewritten. Local only, see .gitignore.
+CACHE_PATH = os.path.join(HERE, ".convert_cache.json")
+CACHE_VERSION = 1
+
+# Module-level string constants named TEMPLATE or *_TEMPLATE are pages. The first of
+# these names found is the game's main page (<module>.html), any other static template
+# becomes <module>_<name>.html.
+MAIN_TEMPLATES = ("GAME_TEMPLATE", "HTML_TEMPLATE", "TEMPLATE")
+
+# {{ expression }}, {% statement %} or {# comment #}: the page only makes sense after
+# Flask renders it, so it can't be published as a static file
+JINJA_RE = re.compile(r"\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\}", re.DOTALL)
 
 # 1. SETUP THE INDEX HTML HEADER
-index_content = """
+INDEX_HEADER = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -16,9 +37,9 @@ index_content = """
         body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: #222; color: #fff; text-align: center; padding: 20px; }
         h1 { color: #f1c40f; margin-bottom: 30px; }
         .game-container { max-width: 600px; margin: 0 auto; }
-        .game-link { 
-            display: block; background: #333; margin: 15px 0; padding: 20px; 
-            text-decoration: none; color: white; border-radius: 10px; 
+        .game-link {
+            display: block; background: #333; margin: 15px 0; padding: 20px;
+            text-decoration: none; color: white; border-radius: 10px;
             border-left: 5px solid #2ecc71; transition: 0.3s;
             text-align: left; font-size: 18px; font-weight: bold;
             display: flex; justify-content: space-between; align-items: center;
@@ -33,62 +54,173 @@ index_content = """
     <div class="game-container">
 """
 
-print(f"--- 🔄 Converting Games to Parent Directory ({os.path.abspath(PARENT_DIR)}) ---")
-
-# 2. SCAN CURRENT FOLDER (.) FOR ALL PYTHON FILES
-files = [f for f in os.listdir('.') if f.endswith('.py')]
-files.sort()
-
-count = 0
-
-for py_file in files:
-    if py_file == "convert_games.py":
-        continue
-
-    with open(py_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # 3. LOOK FOR THE HTML TEMPLATE
-    match = re.search(r'(?:GAME|HTML)?_?TEMPLATE\s*=\s*"""(.*?)"""', content, re.DOTALL)
-    
-    if match:
-        html_content = match.group(1)
-        
-        # Determine new filename (e.g., snake.html)
-        html_filename = py_file.replace('.py', '.html')
-        
-        # Path to save in PARENT directory
-        target_path = os.path.join(PARENT_DIR, html_filename)
-        
-        # Display Name generation
-        display_name = py_file.replace('.py', '').replace('_', ' ').title()
-        display_name = display_name.replace("Game", "").strip()
-        if display_name == "Game 2048": display_name = "2048 Puzzle"
-
-        # Write the HTML file to the PARENT directory
-        with open(target_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-            
-        print(f"✅ Generated: {target_path} ({display_name})")
-        
-        # Add to index (Link refers to file in same directory as index, so no ../ needed in href)
-        index_content += f'<a href="{html_filename}" class="game-link"><span>{display_name}</span> <span class="arrow">▶</span></a>\n'
-        count += 1
-    else:
-        print(f"⚠️  Skipped {py_file} (No HTML template found)")
-
-# 4. FINISH INDEX HTML AND SAVE TO PARENT
-index_content += """
+INDEX_FOOTER = """
     </div>
     <p class="note">Hosted on GitHub Pages • Auto-Generated</p>
 </body></html>
 """
 
-if count > 0:
-    index_path = os.path.join(PARENT_DIR, 'index.html')
-    with open(index_path, 'w', encoding='utf-8') as f:
-        f.write(index_content)
-    print(f"\n🎉 Success! 'index.html' and {count} games saved to parent folder.")
-else:
-    print("\n❌ No compatible game files found.")
+def sha256(data):
+    return hashlib.sha256(data.encode("utf-8") if isinstance(data, str) else data).hexdigest()
+
+def load_cache():
+    try:
+        with open(CACHE_PATH, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {"version": CACHE_VERSION, "modules": {}, "outputs": {}}
+    if cache.get("version") != CACHE_VERSION:
+        return {"version": CACHE_VERSION, "modules": {}, "outputs": {}}
+    return cache
+
+def save_cache(cache):
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)  # key order is the templates' source order
+        f.write("\n")
+    os.replace(tmp_path, CACHE_PATH)
+
+# 2. PARSE A GAME MODULE
+def extract_templates(source, filename="<game>"):
+    # {name: text} for every module-level TEMPLATE / *_TEMPLATE string constant, in
+    # source order. Templates built at runtime (f-strings, concatenation) are not pages.
+    templates = {}
+    for node in ast.parse(source, filename).body:
+        if isinstance(node, ast.Assign):
+            targets, value = node.targets, node.value
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            targets, value = [node.target], node.value
+        else:
+            continue
+        if not (isinstance(value, ast.Constant) and isinstance(value.value, str)):
+            continue
+        for target in targets:
+            if isinstance(target, ast.Name) and (target.id == "TEMPLATE" or target.id.endswith("_TEMPLATE")):
+                templates[target.id] = value.value
+    return templates
+
+def page_names(py_file, templates):
+    # [(template name, html file name, display name)] for the static templates
+    stem = py_file[:-3]
+    # Display Name generation
+    display_name = stem.replace('_', ' ').title()
+    display_name = display_name.replace("Game", "").strip()
+    if display_name == "Game 2048": display_name = "2048 Puzzle"
+
+    static = [name for name, info in templates.items() if not info["jinja"]]
+    main = next((name for name in MAIN_TEMPLATES if name in static), static[0] if static else None)
+    pages = []
+    for name in static:
+        if name == main:
+            pages.append((name, f"{stem}.html", display_name))
+        else:
+            suffix = name[:-len("_TEMPLATE")].lower()
+            pages.append((name, f"{stem}_{suffix}.html", f"{display_name} ({suffix.replace('_', ' ').title()})"))
+    return pages
+
+def scan_module(py_file, cache, force):
+    # Returns (template info, {name: text} or None). The source is only read when the
+    # module changed since the last run; unchanged modules come straight from the cache.
+    path = os.path.join(HERE, py_file)
+    mtime = os.stat(path).st_mtime_ns
+    entry = cache["modules"].get(py_file)
+    if not force and entry and entry["mtime"] == mtime:
+        return entry["templates"], None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    source_hash = sha256(source)
+    if not force and entry and entry["hash"] == source_hash:
+        # Touched but not edited
+        entry["mtime"] = mtime
+        return entry["templates"], None
+
+    try:
+        found = extract_templates(source, py_file)
+    except SyntaxError as e:
+        print(f"❌ Could not parse {py_file}: {e}")
+        found = {}
+    templates = {name: {"hash": sha256(text), "jinja": bool(JINJA_RE.search(text))}
+                 for name, text in found.items()}
+    cache["modules"][py_file] = {"mtime": mtime, "hash": source_hash, "templates": templates}
+    return templates, found
+
+def file_hash(path):
+    try:
+        with open(path, 'rb') as f:
+            return sha256(f.read())
+    except OSError:
+        return None
+
+def write_if_changed(path, content, cache, force):
+    # True if the file was written. A page is left alone when what we'd write is what we
+    # wrote last time and nobody has edited the file since.
+    key = os.path.relpath(path, PARENT_DIR)
+    content_hash = sha256(content)
+    if not force and cache["outputs"].get(key) == content_hash == file_hash(path):
+        return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    cache["outputs"][key] = content_hash
+    return True
+
+def convert(force=False):
+    print(f"--- 🔄 Converting Games to Parent Directory ({os.path.abspath(PARENT_DIR)}) ---")
+    cache = load_cache()
+
+    # 3. SCAN THIS FOLDER FOR ALL PYTHON FILES
+    this_file = os.path.basename(__file__)
+    files = sorted(f for f in os.listdir(HERE) if f.endswith('.py') and f != this_file)
+    cache["modules"] = {name: entry for name, entry in cache["modules"].items() if name in files}
+
+    index_content = INDEX_HEADER
+    count = written = 0
+    for py_file in files:
+        templates, source_templates = scan_module(py_file, cache, force)
+        if not templates:
+            print(f"⚠️  Skipped {py_file} (No HTML template found)")
+            continue
+
+        server_only = [name for name, info in templates.items() if info["jinja"]]
+        if server_only:
+            print(f"🖥️  {py_file}: {', '.join(server_only)} use Jinja and need server rendering, not published")
+
+        for name, html_filename, display_name in page_names(py_file, templates):
+            target_path = os.path.join(PARENT_DIR, html_filename)
+            key = os.path.relpath(target_path, PARENT_DIR)
+            # Nothing to write: page on disk is still the one we made from this template
+            if (not force and source_templates is None
+                    and cache["outputs"].get(key) == templates[name]["hash"] == file_hash(target_path)):
+                unchanged = True
+            else:
+                if source_templates is None:
+                    # Cached module, but the page went missing or was edited: parse again
+                    with open(os.path.join(HERE, py_file), 'r', encoding='utf-8') as f:
+                        source_templates = extract_templates(f.read(), py_file)
+                unchanged = not write_if_changed(target_path, source_templates[name], cache, force)
+            if unchanged:
+                print(f"✔️  Up to date: {html_filename} ({display_name})")
+            else:
+                written += 1
+                print(f"✅ Generated: {html_filename} ({display_name})")
+
+            # Add to index (Link refers to file in same directory as index, so no ../ needed in href)
+            index_content += f'<a href="{html_filename}" class="game-link"><span>{display_name}</span> <span class="arrow">▶</span></a>\n'
+            count += 1
+
+    # 4. FINISH INDEX HTML AND SAVE TO PARENT
+    index_content += INDEX_FOOTER
+    if count > 0:
+        index_path = os.path.join(PARENT_DIR, 'index.html')
+        if write_if_changed(index_path, index_content, cache, force):
+            written += 1
+        print(f"\n🎉 Success! {count} games in 'index.html', {written} files written to parent folder.")
+    else:
+        print("\n❌ No compatible game files found.")
+    save_cache(cache)
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the HTML templates of the Python games as static pages")
+    parser.add_argument("--force", action="store_true", help="ignore the cache, parse and write everything")
+    args = parser.parse_args()
+    convert(force=args.force)
@@ -0,0 +1,49 @@
+# Serving for the games whose page is one fixed HTML string (no template variables).
+# The page is rendered once, gzipped once, and every request gets those same bytes with
+# an ETag, so a reload is an empty 304 and a first visit is a fraction of the size.
+#
+#   page = StaticPage(app, GAME_TEMPLATE)
+#
+#   @app.route('/')
+#   def index():
+#       return page.response()
+import gzip
+import hashlib
+import threading
+
+from flask import Response, request
+
+GZIP_LEVEL = 9
+
+
+class StaticPage:
+    def __init__(self, app, source):
+        self.app = app
+        self.source = source
+        self._lock = threading.Lock()
+        self.body = None  # rendered on first request, not at import
+
+    def render(self):
+        with self._lock:
+            if self.body is None:
+                # Through Jinja once, so the bytes are exactly what render_template_string()
+                # used to produce on every request
+                body = self.app.jinja_env.from_string(self.source).render().encode('utf-8')
+                self.gzipped = gzip.compress(body, GZIP_LEVEL, mtime=0)
+                self.etag = hashlib.sha1(body).hexdigest()
+                self.body = body
+
+    def response(self):
+        if self.body is None:
+            self.render()
+        # The gzipped bytes are a different representation, so they get their own ETag
+        if request.accept_encodings['gzip']:
+            response = Response(self.gzipped, mimetype='text/html')
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(self.etag + '-gz')
+        else:
+            response = Response(self.body, mimetype='text/html')
+            response.set_etag(self.etag)
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = 'no-cache'  # always revalidate, a 304 is cheap
+        return response.make_conditional(request)
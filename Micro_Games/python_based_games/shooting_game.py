@@ -1,4 +1,5 @@
-from flask import Flask, render_template_string
+from flask import Flask
+from game_page import StaticPage
 
 app = Flask(__name__)
 
@@ -321,9 +322,12 @@ GAME_TEMPLATE = """
 </html>
 """
 
+# The page has no variables: rendered and gzipped once, then served with an ETag
+page = StaticPage(app, GAME_TEMPLATE)
+
 @app.route('/')
 def index():
-    return render_template_string(GAME_TEMPLATE)
+    return page.response()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,239 @@
+# The same functional checks against chess_game.py (Flask) and chess_game_async.py (Quart):
+# register/login, create and join, legal and illegal moves, the /api/state ETag, /api/states
+# and the live push (Server-Sent Events on Flask, the WebSocket on Quart).
+#   python -m pytest Micro_Games/python_based_games/tests
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+# A throwaway database, cheap password hashes and no worker processes or archiver
+os.environ['CHESS_DB'] = os.path.join(tempfile.mkdtemp(prefix='chess_test_'), 'chess.db')
+os.environ['CHESS_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ['CHESS_HASH_WORKERS'] = '0'
+os.environ['CHESS_AI_WORKERS'] = '0'
+os.environ['CHESS_ARCHIVE_INTERVAL'] = '0'
+
+import chess_game  # noqa: E402
+
+chess_game.STREAM_KEEPALIVE = 0.5  # so a push that never comes fails instead of hanging
+
+pytest.importorskip('quart')
+import chess_game_async  # noqa: E402
+
+PASSWORD = 'correct horse'
+usernames = ('player%d' % i for i in itertools.count())
+
+
+class Reply:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class FlaskServer:
+    # chess_game.app behind the same async interface as the Quart client
+    def __init__(self):
+        self.client = chess_game.app.test_client()
+
+    async def get(self, url, headers=None):
+        r = self.client.get(url, headers=headers)
+        return Reply(r.status_code, r.headers, r.get_data())
+
+    async def post(self, url, form=None, json=None):
+        r = self.client.post(url, data=form, json=json)
+        return Reply(r.status_code, r.headers, r.get_data())
+
+    async def push(self, game_id, after):
+        # First event of /api/stream, then whatever after() changes
+        r = self.client.get('/api/stream/%d' % game_id, buffered=False)
+        deadline = time.monotonic() + 5
+
+        def data():
+            for chunk in r.response:
+                if b'data: ' in chunk:
+                    yield chunk.split(b'data: ', 1)[1]
+                elif time.monotonic() > deadline:  # a keepalive, and nothing came in time
+                    raise AssertionError('no event pushed')
+
+        events = data()
+        try:
+            states = [json.loads(next(events))]
+            await after()
+            states.append(json.loads(next(events)))
+        finally:
+            r.close()
+        return states
+
+
+class QuartServer:
+    def __init__(self):
+        self.client = chess_game_async.app.test_client()
+
+    async def get(self, url, headers=None):
+        r = await self.client.get(url, headers=headers)
+        return Reply(r.status_code, r.headers, await r.get_data())
+
+    async def post(self, url, form=None, json=None):
+        # Quart tells "no json" apart from json=None, so only pass what was given
+        r = await self.client.post(url, **({'form': form} if json is None else {'json': json}))
+        return Reply(r.status_code, r.headers, await r.get_data())
+
+    async def push(self, game_id, after):
+        async with self.client.websocket('/ws/%d' % game_id) as ws:
+            states = [json.loads(await ws.receive())]
+            await after()
+            states.append(json.loads(await asyncio.wait_for(ws.receive(), 5)))
+        return states
+
+
+@pytest.fixture(params=[FlaskServer, QuartServer], ids=['flask', 'quart'])
+def server(request):
+    return request.param
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def logged_in(server):
+    player = server()
+    username = next(usernames)
+    r = await player.post('/', form={'action': 'register', 'username': username, 'password': PASSWORD})
+    assert b'Registration successful' in r.body
+    r = await player.post('/', form={'action': 'login', 'username': username, 'password': PASSWORD})
+    assert r.status == 302 and r.headers['Location'].endswith('/lobby')
+    return player
+
+
+async def started_game(server):
+    # (white, black, game id) for a game both players have joined
+    white = await logged_in(server)
+    black = await logged_in(server)
+    r = await white.post('/create_game', form={'opponent': 'human'})
+    assert r.status == 302
+    game_id = int(re.search(rb'/game/(\d+)', (await white.get('/lobby')).body).group(1))
+    r = await black.get('/join/%d' % game_id)
+    assert r.status == 302 and r.headers['Location'].endswith('/game/%d' % game_id)
+    return white, black, game_id
+
+
+def test_register_and_login(server):
+    async def flow():
+        player = await logged_in(server)
+        r = await player.get('/lobby')
+        assert r.status == 200 and b'Logout' in r.body
+
+        stranger = server()
+        r = await stranger.post('/', form={'action': 'login', 'username': 'nobody', 'password': PASSWORD})
+        assert b'Invalid username or password' in r.body
+        assert (await stranger.get('/lobby')).status == 302
+    run(flow())
+
+
+def test_create_and_join(server):
+    async def flow():
+        white, black, game_id = await started_game(server)
+        assert (await black.get('/game/%d' % game_id)).status == 200
+        state = (await white.get('/api/state/%d' % game_id)).json()
+        assert state['status'] == 'active' and state['ply'] == 0
+    run(flow())
+
+
+def test_legal_move(server):
+    async def flow():
+        white, black, game_id = await started_game(server)
+        r = await white.post('/api/move/%d' % game_id, json={'from': 'e2', 'to': 'e4'})
+        assert r.status == 200
+        assert r.json()['fen'] == 'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1'
+        moves = (await black.get('/api/moves/%d' % game_id)).json()['moves']
+        assert [m['uci'] for m in moves] == ['e2e4']
+    run(flow())
+
+
+def test_illegal_move(server):
+    async def flow():
+        white, black, game_id = await started_game(server)
+        for player, move, status in ((white, {'from': 'e2', 'to': 'e5'}, 400),
+                                     (white, {'from': 'x9', 'to': 'e4'}, 400),
+                                     (white, {'from': {}, 'to': 'e4'}, 400),
+                                     (white, {'from': 'e2', 'to': 'e4', 'promotion': 5}, 400),
+                                     (white, [1], 400),
+                                     (white, 'e2e4', 400),
+                                     (black, {'from': 'e7', 'to': 'e5'}, 409)):  # not black's turn
+            r = await player.post('/api/move/%d' % game_id, json=move)
+            assert r.status == status, move
+            assert 'error' in r.json()
+        assert (await white.get('/api/state/%d' % game_id)).json()['ply'] == 0
+    run(flow())
+
+
+def test_state_etag(server):
+    async def flow():
+        white, black, game_id = await started_game(server)
+        r = await white.get('/api/state/%d' % game_id)
+        etag = r.headers['ETag']
+        r = await white.get('/api/state/%d' % game_id, headers={'If-None-Match': etag})
+        assert r.status == 304 and r.body == b''
+
+        await white.post('/api/move/%d' % game_id, json={'from': 'd2', 'to': 'd4'})
+        r = await white.get('/api/state/%d' % game_id, headers={'If-None-Match': etag})
+        assert r.status == 200 and r.headers['ETag'] != etag
+        assert (await white.get('/api/state/999999')).status == 404
+    run(flow())
+
+
+def test_states(server):
+    async def flow():
+        white, black, game_id = await started_game(server)
+        version = (await white.get('/api/state/%d' % game_id)).json()['version']
+        r = await white.post('/api/states', json={'games': {str(game_id): version, '999999': 0}})
+        assert r.json() == {'games': {}, 'missing': [999999]}
+
+        await white.post('/api/move/%d' % game_id, json={'from': 'g1', 'to': 'f3'})
+        changed = (await white.post('/api/states', json={'games': {str(game_id): version}})).json()['games']
+        assert changed[str(game_id)]['ply'] == 1
+    run(flow())
+
+
+def test_push_after_move(server):
+    async def flow():
+        white, black, game_id = await started_game(server)
+
+        async def move():
+            r = await white.post('/api/move/%d' % game_id, json={'from': 'c2', 'to': 'c4'})
+            assert r.status == 200
+
+        before, after = await black.push(game_id, move)
+        assert before['ply'] == 0
+        assert after['ply'] == 1 and after['turn'] == 'b'
+    run(flow())
+
+
+def test_abandoned_game(server):
+    async def flow():
+        white, black, game_id = await started_game(server)
+        etag = (await white.get('/api/state/%d' % game_id)).headers['ETag']
+
+        async def archive():
+            chess_game.archive_games(idle_hours=-1)  # every game counts as idle
+
+        before, after = await black.push(game_id, archive)
+        assert before['status'] == 'active' and after['status'] == 'abandoned'
+        r = await white.get('/api/state/%d' % game_id, headers={'If-None-Match': etag})
+        assert r.status == 200 and r.json()['status'] == 'abandoned'
+        assert (await white.get('/game/%d' % game_id)).status == 200
+    run(flow())
@@ -0,0 +1,136 @@
+# Startup time and resident memory of microverse_server.py (every app in one process)
+# against one process per app, the way they run on their own. Linux only (/proc).
+#   python benchmarks/bench_microverse_server.py
+#   python benchmarks/bench_microverse_server.py --apps snake_game calculator chess_game
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import microverse_server  # noqa: E402
+
+# One app on its own, as `python <module>.py` would run it but on a port of our choosing.
+# A fourth argument runs the app's warm-up first, like its __main__ does.
+STANDALONE = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import importlib
+from werkzeug.serving import make_server
+module = importlib.import_module(sys.argv[2])
+if len(sys.argv) > 4 and hasattr(module, {warm_up!r}):
+    getattr(module, {warm_up!r})()
+hook = {hooks!r}.get(sys.argv[2])
+if hook:
+    getattr(module, hook)()
+make_server('127.0.0.1', int(sys.argv[3]), module.app, threaded=True).serve_forever()
+""".format(hooks=microverse_server.STARTUP_HOOKS, warm_up=microverse_server.WARM_UP_HOOK)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=30):
+    # Seconds until the url answers
+    start = time.perf_counter()
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read()
+            return time.perf_counter() - start
+        except OSError:
+            if time.perf_counter() - start > timeout:
+                raise
+            time.sleep(0.005)
+
+
+def tree_rss_kb(pid):
+    # VmRSS of a process and all its children (eval workers, hash pools, ...)
+    total = 0
+    try:
+        with open('/proc/%d/status' % pid) as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+        for task in os.listdir('/proc/%d/task' % pid):
+            with open('/proc/%d/task/%s/children' % (pid, task)) as f:
+                for child in f.read().split():
+                    total += tree_rss_kb(int(child))
+    except OSError:
+        pass
+    return total
+
+
+def combined(apps, env):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'microverse_server.py'),
+                               '--host', '127.0.0.1', '--port', str(port)],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for('http://127.0.0.1:%d/' % port)
+        ready = time.perf_counter() - start
+        idle_kb = tree_rss_kb(server.pid)
+        first = {}
+        for name in apps:
+            first[name] = wait_for('http://127.0.0.1:%d%s/%s/' % (port, microverse_server.APP_PREFIX, name))
+        return ready, idle_kb, first, tree_rss_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def separate(apps, folders, env):
+    results = {}
+    for name in apps:
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, '-c', STANDALONE, folders[name], name, str(port), 'warm'],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for('http://127.0.0.1:%d/' % port)
+            results[name] = (time.perf_counter() - start, tree_rss_kb(server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def main():
+    folders = microverse_server.discover_apps()
+    parser = argparse.ArgumentParser(description='Compare one combined server with one process per app')
+    parser.add_argument('--apps', nargs='+', default=list(folders), choices=list(folders))
+    args = parser.parse_args()
+
+    # Keep the benchmark away from the real chess database
+    env = dict(os.environ)
+    env.setdefault('CHESS_DB', os.path.join(tempfile.mkdtemp(prefix='microverse_bench_'), 'chess.db'))
+
+    ready, idle_kb, first, loaded_kb = combined(args.apps, env)
+    alone = separate(args.apps, folders, env)
+
+    print("%-18s %16s %16s %14s" % ('app', 'separate: ready', 'combined: first', 'separate RSS'))
+    for name in args.apps:
+        print("%-18s %14.0fms %14.0fms %11.1f MB" % (name, alone[name][0] * 1000, first[name] * 1000,
+                                                    alone[name][1] / 1024))
+    print()
+    print("%-34s %12s %12s" % ('', 'startup', 'RSS'))
+    print("%-34s %10.0fms %9.1f MB" % ('separate processes (sum)', sum(t for t, _ in alone.values()) * 1000,
+                                       sum(kb for _, kb in alone.values()) / 1024))
+    print("%-34s %10.0fms %9.1f MB" % ('combined, before any request', ready * 1000, idle_kb / 1024))
+    print("%-34s %10.0fms %9.1f MB" % ('combined, every app loaded', (ready + sum(first.values())) * 1000,
+                                       loaded_kb / 1024))
+
+
+if __name__ == '__main__':
+    main()
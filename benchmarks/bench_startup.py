@@ -0,0 +1,82 @@
+# What each app costs before it can answer: the `python -X importtime` total for
+# importing the module, the heaviest imports inside it, and the time from starting the
+# process to the first response on "/", with the app's deferred setup left to first use
+# (how microverse_server.py loads it) and with its warm_up() run first (its own __main__).
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --apps chess_game calculator --top 5
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import microverse_server  # noqa: E402
+from bench_microverse_server import STANDALONE, free_port, wait_for  # noqa: E402
+
+
+def import_profile(name, folder, env):
+    # (total us, [(self us, module)] heaviest first) for a fresh interpreter importing name
+    # __import__ because some module names (2048_game) can't be spelled in an import statement
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', '__import__(%r)' % name],
+                            cwd=folder, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(self_us), module.strip()))
+        if module.strip() == name:
+            total = int(cumulative_us)
+    rows.sort(reverse=True)
+    return total, rows
+
+
+def first_response(name, folder, env, warm=False):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-c', STANDALONE, folder, name, str(port)] + (['warm'] if warm else []),
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for('http://127.0.0.1:%d/' % port)
+        return time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    folders = microverse_server.discover_apps()
+    parser = argparse.ArgumentParser(description='Import cost and time to first response per app')
+    parser.add_argument('--apps', nargs='+', default=list(folders), choices=list(folders))
+    parser.add_argument('--top', type=int, default=3, help='heaviest imports to list per app')
+    parser.add_argument('--runs', type=int, default=3, help='best of this many runs')
+    args = parser.parse_args()
+
+    # A fresh database every time, so schema creation is part of what's measured
+    env = dict(os.environ)
+    tmp = tempfile.mkdtemp(prefix='microverse_startup_')
+
+    print("%-16s %10s %10s %10s  %s" % ('app', 'import ms', 'lazy ms', 'warmed ms', 'heaviest imports (self ms)'))
+    for name in args.apps:
+        imports, lazy, warmed = [], [], []
+        for run in range(args.runs):
+            env['CHESS_DB'] = os.path.join(tmp, '%s_%d_import.db' % (name, run))
+            imports.append(import_profile(name, folders[name], env))
+            env['CHESS_DB'] = os.path.join(tmp, '%s_%d_lazy.db' % (name, run))
+            lazy.append(first_response(name, folders[name], env))
+            env['CHESS_DB'] = os.path.join(tmp, '%s_%d_warm.db' % (name, run))
+            warmed.append(first_response(name, folders[name], env, warm=True))
+        total, rows = min(imports)
+        heaviest = ', '.join('%s %.0f' % (module, us / 1000) for us, module in rows[:args.top])
+        print("%-16s %10.0f %10.0f %10.0f  %s" % (name, total / 1000, min(lazy) * 1000, min(warmed) * 1000, heaviest))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Per-request page rendering cost: render_template_string() (compiles the template source
+# on every call) against the precompiled Template objects, and for the static game pages
+# against the pre-rendered, gzipped StaticPage bytes.
+#   python benchmarks/bench_templates.py --repeat 500
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+GAMES_DIR = os.path.join(ROOT, 'Micro_Games', 'python_based_games')
+APPS_DIR = os.path.join(ROOT, 'Micro_Apps', 'python_based_apps')
+sys.path[:0] = [ROOT, GAMES_DIR, APPS_DIR]
+
+os.environ.setdefault('CHESS_DB', os.path.join(tempfile.mkdtemp(prefix='bench_templates_'), 'chess.db'))
+
+from flask import render_template, render_template_string  # noqa: E402
+
+STATIC_GAMES = ['snake_game', '2048_game', 'craft_game', 'mario_game', 'shooting_game', 'vice_city_game',
+                'musical_chairs']
+
+FEN = 'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1'
+LOBBY_GAMES = [{'id': i, 'white_id': 1, 'black_id': 2, 'status': 'active', 'fen': FEN, 'version': i}
+               for i in range(1, 21)]
+
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def dynamic_pages():
+    # (name, app, url, template source, compiled(), context)
+    import calculator
+    import chess_game
+    return [
+        ('calculator /', calculator.app, '/', calculator.HTML_TEMPLATE, calculator.compiled,
+         {'result': '42', 'backend': 'float'}),
+        ('chess login', chess_game.app, '/', chess_game.LOGIN_TEMPLATE, chess_game.compiled,
+         {'error': None, 'msg': None}),
+        ('chess lobby', chess_game.app, '/lobby', chess_game.LOBBY_TEMPLATE, chess_game.compiled,
+         {'my_games': LOBBY_GAMES, 'open_games': LOBBY_GAMES, 'next_before': None, 'username': 'ann',
+          'user_id': 1}),
+        ('chess board', chess_game.app, '/game/1', chess_game.GAME_TEMPLATE, chess_game.compiled,
+         {'game_id': 1, 'is_white': True}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-request template rendering')
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    print("%-16s %12s %12s %8s" % ('page', 'string us', 'compiled us', 'speedup'))
+    for name, app, url, source, compiled, context in dynamic_pages():
+        with app.test_request_context(url):
+            before = per_call_us(lambda: render_template_string(source, **context), args.repeat)
+            compiled(source)
+            after = per_call_us(lambda: render_template(compiled(source), **context), args.repeat)
+        print("%-16s %12.1f %12.1f %7.1fx" % (name, before, after, before / after))
+
+    print()
+    print("%-16s %12s %12s %12s %9s %9s" % ('static game', 'string us', 'bytes us', '304 us', 'raw KB', 'gzip KB'))
+    for name in STATIC_GAMES:
+        module = importlib.import_module(name)
+        page = module.page
+        with module.app.test_request_context('/'):
+            # What the route used to do, down to the Response object
+            before = per_call_us(lambda: module.app.make_response(render_template_string(module.GAME_TEMPLATE)),
+                                 args.repeat)
+        with module.app.test_request_context('/', headers={'Accept-Encoding': 'gzip'}):
+            page.response()
+            after = per_call_us(page.response, args.repeat)
+        with module.app.test_request_context('/', headers={'Accept-Encoding': 'gzip',
+                                                           'If-None-Match': '"%s-gz"' % page.etag}):
+            assert page.response().status_code == 304
+            not_modified = per_call_us(page.response, args.repeat)
+        print("%-16s %12.1f %12.1f %12.1f %9.1f %9.1f" % (name, before, after, not_modified,
+                                                         len(page.body) / 1024, len(page.gzipped) / 1024))
+
+
+if __name__ == '__main__':
+    main()
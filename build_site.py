@@ -0,0 +1,201 @@
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# CONFIGURATION
+# ---------------------------------------------------------
+# Builds the GitHub Pages site into _site/: every HTML page gets its inline CSS/JS
+# minified and precompressed .gz / .br siblings, everything else is copied as is.
+#   python build_site.py                 # build with one worker per CPU
+#   python build_site.py --indexes       # run update_microverse.py first
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(ROOT, "_site")
+
+# Never published: local databases, bytecode, and anything hidden (.git, .github, manifests)
+SKIP_DIRS = {"_site", "__pycache__"}
+SKIP_SUFFIXES = (".pyc", ".db", ".db-wal", ".db-shm")
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# --- MINIFY ---
+# Deliberately conservative: whitespace and comments only, no renaming and no joining of
+# JS lines (automatic semicolon insertion makes that unsafe without a real parser).
+
+RAW_BLOCK_RE = re.compile(r"(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)", re.S | re.I)
+HTML_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.S)
+CSS_STRING_RE = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+JS_TYPES = ("", "text/javascript", "application/javascript", "module")
+
+
+def minify_css(css):
+    parts = CSS_STRING_RE.split(CSS_COMMENT_RE.sub("", css))
+    for i in range(0, len(parts), 2):  # odd parts are string literals, left alone
+        text = re.sub(r"\s+", " ", parts[i])
+        text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+        parts[i] = re.sub(r":\s+", ":", text).replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def scan_js_line(line, quote):
+    # Returns the string delimiter still open at the end of the line (only a template
+    # literal can span lines). Stops at a // comment outside strings.
+    i = 0
+    while i < len(line):
+        ch = line[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "'\"`":
+            quote = ch
+        elif line.startswith("//", i):
+            break
+        i += 1
+    return quote if quote == "`" else None
+
+
+def minify_js(js):
+    out = []
+    quote = None
+    in_comment = False
+    for line in js.split("\n"):
+        if quote:
+            # Inside a multi-line template literal, whitespace is part of the string
+            out.append(line)
+            quote = scan_js_line(line, quote)
+            continue
+        text = line.strip()
+        if in_comment:
+            if "*/" not in text:
+                continue
+            text = text.split("*/", 1)[1].strip()
+            in_comment = False
+        if text.startswith("/*"):
+            if "*/" not in text:
+                in_comment = True
+                continue
+            text = text.split("*/", 1)[1].strip()
+        if not text or text.startswith("//"):
+            continue
+        out.append(text)
+        quote = scan_js_line(text, None)
+    return "\n".join(out)
+
+
+def minify_markup(html):
+    lines = (line.strip() for line in HTML_COMMENT_RE.sub("", html).split("\n"))
+    text = "\n".join(line for line in lines if line)
+    # Whitespace next to a <script>/<pre> block can matter in inline text, keep one
+    lead = "\n" if html[:1].isspace() else ""
+    trail = "\n" if html[-1:].isspace() and text else ""
+    return lead + text + trail
+
+
+def minify_html(html):
+    out = []
+    last = 0
+    for match in RAW_BLOCK_RE.finditer(html):
+        out.append(minify_markup(html[last:match.start()]))
+        open_tag, tag, body, close_tag = match.groups()
+        tag = tag.lower()
+        script_type = re.search(r"\btype\s*=\s*[\"']?([^\"'\s>]*)", open_tag, re.I)
+        if tag == "style":
+            body = minify_css(body)
+        elif tag == "script" and (script_type.group(1).lower() if script_type else "") in JS_TYPES:
+            body = minify_js(body)
+        out.append(open_tag + body + close_tag)
+        last = match.end()
+    out.append(minify_markup(html[last:]))
+    return "".join(out).strip() + "\n"
+
+# --- BUILD ---
+
+def build_page(rel_path):
+    # Runs in a worker process: minify one page and write it with its compressed siblings
+    with open(os.path.join(ROOT, rel_path), "rb") as f:
+        raw = f.read()
+    minified = minify_html(raw.decode("utf-8")).encode("utf-8")
+    target = os.path.join(OUTPUT_DIR, rel_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as f:
+        f.write(minified)
+
+    gz = gzip.compress(minified, GZIP_LEVEL, mtime=0)  # mtime=0 keeps builds byte-identical
+    with open(target + ".gz", "wb") as f:
+        f.write(gz)
+    br_size = None
+    if brotli is not None:
+        br = brotli.compress(minified, quality=BROTLI_QUALITY, mode=brotli.MODE_TEXT)
+        with open(target + ".br", "wb") as f:
+            f.write(br)
+        br_size = len(br)
+    return rel_path, len(raw), len(minified), len(gz), br_size
+
+
+def site_files():
+    pages, others = [], []
+    for dirpath, dirnames, filenames in os.walk(ROOT):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            if name.startswith(".") or name.endswith(SKIP_SUFFIXES):
+                continue
+            rel_path = os.path.relpath(os.path.join(dirpath, name), ROOT)
+            (pages if name.endswith(".html") else others).append(rel_path)
+    return pages, others
+
+
+def build_site(jobs=None):
+    if os.path.exists(OUTPUT_DIR):
+        shutil.rmtree(OUTPUT_DIR)
+    pages, others = site_files()
+    for rel_path in others:
+        target = os.path.join(OUTPUT_DIR, rel_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(os.path.join(ROOT, rel_path), target)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(build_page, pages)), len(others)
+
+
+def size_report(results):
+    def kb(n):
+        return "-" if n is None else f"{n / 1024:.1f}"
+
+    print(f"{'page':<32} {'raw KB':>8} {'min KB':>8} {'gz KB':>8} {'br KB':>8}")
+    totals = [0, 0, 0, 0]
+    for rel_path, raw, minified, gz, br in results:
+        print(f"{rel_path:<32} {kb(raw):>8} {kb(minified):>8} {kb(gz):>8} {kb(br):>8}")
+        for i, n in enumerate((raw, minified, gz, br or 0)):
+            totals[i] += n
+    print(f"{'total':<32} {kb(totals[0]):>8} {kb(totals[1]):>8} {kb(totals[2]):>8} "
+          f"{kb(totals[3] if brotli else None):>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the minified, precompressed site into _site/")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--indexes", action="store_true", help="regenerate the folder indexes first")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.indexes:
+        import update_microverse
+        update_microverse.generate_index()
+    results, copied = build_site(args.jobs)
+    size_report(results)
+    print(f"✅ Built {len(results)} pages ({copied} other files copied) into _site/ "
+          f"in {time.perf_counter() - start:.2f}s")
+    if brotli is None:
+        print("Note: brotli is not installed, no .br files were written (pip install brotli)", file=sys.stderr)
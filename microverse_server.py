@@ -0,0 +1,160 @@
+import argparse
+import ast
+import importlib
+import os
+import sys
+import threading
+import time
+
+from flask import Flask, abort, send_from_directory
+from markupsafe import escape
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.serving import run_simple
+
+# CONFIGURATION
+# ---------------------------------------------------------
+# Runs every Flask app in the Microverse from one process on one port, instead of one
+# interpreter per app all fighting over :5000. Each app lives under /app/<module>/ and is
+# only imported when its first request arrives; everything else is the static site
+# (index.html and the folder indexes written by update_microverse.py).
+#   python microverse_server.py                  # http://localhost:5000/
+#   python microverse_server.py --warm           # load and warm up every app in the background
+#   python microverse_server.py --preload        # ... or before the server starts listening
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PREFIX = "/app"
+
+# Where to look for apps: any module that assigns a Flask(...) to a module-level 'app'
+APP_DIRS = [
+    os.path.join(ROOT, "Micro_Apps", "python_based_apps"),
+    os.path.join(ROOT, "Micro_Games", "python_based_games"),
+]
+
+# Background jobs that the apps only start from their own __main__
+STARTUP_HOOKS = {
+    "chess_game": "start_archiver",
+}
+
+# Optional module-level function an app can define for the slow parts of its startup
+# (schema setup, big tables). It runs with --warm / --preload; otherwise the app does
+# that work on first use.
+WARM_UP_HOOK = "warm_up"
+
+def defines_flask_app(path):
+    with open(path, encoding="utf-8") as f:
+        try:
+            tree = ast.parse(f.read(), path)
+        except SyntaxError:
+            return False
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)
+                and isinstance(node.value.func, ast.Name) and node.value.func.id == "Flask"
+                and any(isinstance(t, ast.Name) and t.id == "app" for t in node.targets)):
+            return True
+    return False
+
+def discover_apps():
+    # {module name: folder}, found by reading the source so nothing is imported yet
+    apps = {}
+    for folder in APP_DIRS:
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".py") and defines_flask_app(os.path.join(folder, name)):
+                apps[name[:-3]] = folder
+    return apps
+
+class LazyApp:
+    # WSGI app that imports its module on the first request and hands everything to the
+    # module's Flask app from then on
+    def __init__(self, name, folder, prefix):
+        self.name = name
+        self.folder = folder
+        self.prefix = prefix
+        self.load_seconds = None
+        self.warm_seconds = None
+        self._module = None
+        self._app = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._app is None:
+                start = time.perf_counter()
+                if self.folder not in sys.path:
+                    sys.path.insert(0, self.folder)  # for sibling imports like chess_engine
+                module = importlib.import_module(self.name)
+                app = module.app
+                # Every app calls its cookie 'session'; keep each one to its own prefix
+                app.config["SESSION_COOKIE_PATH"] = self.prefix
+                hook = STARTUP_HOOKS.get(self.name)
+                if hook:
+                    getattr(module, hook)()
+                self.load_seconds = time.perf_counter() - start
+                self._module = module
+                self._app = app
+        return self._app
+
+    def warm(self):
+        self.load()
+        hook = getattr(self._module, WARM_UP_HOOK, None)
+        if hook is not None and self.warm_seconds is None:
+            start = time.perf_counter()
+            hook()
+            self.warm_seconds = time.perf_counter() - start
+
+    def __call__(self, environ, start_response):
+        return (self._app or self.load())(environ, start_response)
+
+def warm_all(mounts):
+    for lazy in mounts.values():
+        try:
+            lazy.warm()
+        except Exception as e:
+            # The app still gets its chance on first request, where the error shows up properly
+            print(f"⚠️  Warm-up of {lazy.name} failed: {e}")
+
+def create_app(preload=False):
+    site = Flask(__name__, static_folder=None)
+    mounts = {}
+    for name, folder in discover_apps().items():
+        prefix = f"{APP_PREFIX}/{name}"
+        mounts[prefix] = LazyApp(name, folder, prefix)
+    if preload:
+        warm_all(mounts)
+
+    @site.route("/")
+    @site.route("/<path:path>")
+    def static_page(path=""):
+        # Only the site's pages, never the Python sources or databases next to them
+        if path == "" or path.endswith("/"):
+            path += "index.html"
+        if not path.endswith(".html"):
+            abort(404)
+        return send_from_directory(ROOT, path)
+
+    @site.route(f"{APP_PREFIX}/")
+    def app_list():
+        links = "".join(
+            f'<li><a href="{prefix}/">{escape(lazy.name)}</a>'
+            f'{" (loaded in %.0f ms)" % (lazy.load_seconds * 1000) if lazy.load_seconds is not None else ""}</li>'
+            for prefix, lazy in mounts.items())
+        return f"<!DOCTYPE html><title>Microverse apps</title><h1>Apps</h1><ul>{links}</ul>"
+
+    return DispatcherMiddleware(site, mounts), mounts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve every Microverse app from one process")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--preload", action="store_true", help="load and warm up every app before serving")
+    parser.add_argument("--warm", action="store_true", help="load and warm up every app in the background")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    application, mounts = create_app(preload=args.preload)
+    for prefix in mounts:
+        print(f"🔗 {prefix}/")
+    print(f"✅ {len(mounts)} apps mounted in {(time.perf_counter() - start) * 1000:.0f} ms")
+    if args.warm and not args.preload:
+        threading.Thread(target=warm_all, args=(mounts,), name="microverse-warm-up", daemon=True).start()
+    run_simple(args.host, args.port, application, threaded=True)
@@ -1,7 +1,19 @@
+import argparse
+import hashlib
+import json
 import os
+import sys
 
 # CONFIGURATION
 # ---------------------------------------------------------
+# Paths are relative to this script, so it can be run from anywhere
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Hashes of what each index.html was built from and what was written, so unchanged
+# indexes are neither rebuilt nor rewritten. Local only, see .gitignore.
+MANIFEST_PATH = os.path.join(ROOT, ".microverse_manifest.json")
+MANIFEST_VERSION = 1
+
 # The folders to scan
 folders = {
     "Micro_Apps": "🚀 Micro Apps",
@@ -44,45 +56,109 @@ html_template = """
 </html>
 """
 
-def generate_index():
-    for folder, display_name in folders.items():
-        # Check if folder exists
-        if not os.path.exists(folder):
-            print(f"Warning: Folder '{folder}' not found. Skipping.")
-            continue
+def sha256(data):
+    return hashlib.sha256(data.encode("utf-8") if isinstance(data, str) else data).hexdigest()
 
-        # Get all HTML files in the folder (excluding index.html)
-        files = [f for f in os.listdir(folder) if f.endswith('.html') and f != 'index.html']
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return sha256(f.read())
+    except OSError:
+        return None
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "outputs": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "outputs": {}}
+    return manifest
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def index_inputs(folder, display_name):
+    # Everything an index.html depends on: the page template, the heading and the
+    # sorted list of pages in the folder (their contents don't affect the index)
+    files = sorted(f for f in os.listdir(os.path.join(ROOT, folder)) if f.endswith('.html') and f != 'index.html')
+    key = sha256(json.dumps([html_template, display_name, files]))
+    return files, key
+
+def render_index(files, display_name):
+    links_html = ""
+    for file in files:
+        # Create a clean name (e.g., "shooting_game.html" -> "Shooting Game")
+        clean_name = file.replace(".html", "").replace("_", " ").title()
         
-        links_html = ""
-        for file in files:
-            # Create a clean name (e.g., "shooting_game.html" -> "Shooting Game")
-            clean_name = file.replace(".html", "").replace("_", " ").title()
-            
-            links_html += f"""
+        links_html += f"""
             <a href="{file}" class="link-item">
                 <span>{clean_name}</span> 
                 <span style="color:#777">▶</span>
             </a>
             """
-        
-        if not links_html:
-            links_html = "<p style='color:#777'>No files found yet.</p>"
-
-        # Fill the template
-        final_html = html_template.format(
-            title=display_name,
-            header=display_name,
-            links=links_html
-        )
-
-        # Write the index.html file inside the folder
-        output_path = os.path.join(folder, "index.html")
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(final_html)
-        
-        print(f"✅ Updated {output_path} with {len(files)} items.")
+    
+    if not links_html:
+        links_html = "<p style='color:#777'>No files found yet.</p>"
+
+    # Fill the template
+    return html_template.format(
+        title=display_name,
+        header=display_name,
+        links=links_html
+    )
+
+def generate_index(force=False, check=False):
+    # Returns the list of index files that were (or, with check, would be) rewritten
+    manifest = load_manifest()
+    changed = []
+    for folder, display_name in folders.items():
+        # Check if folder exists
+        if not os.path.exists(os.path.join(ROOT, folder)):
+            print(f"Warning: Folder '{folder}' not found. Skipping.")
+            continue
+
+        output_name = f"{folder}/index.html"
+        output_path = os.path.join(ROOT, folder, "index.html")
+        files, input_key = index_inputs(folder, display_name)
+        entry = manifest["outputs"].get(output_name, {})
+        current_hash = file_hash(output_path)
+
+        # Up to date: same inputs as last time and nobody touched the output since
+        if not force and entry.get("inputs") == input_key and entry.get("output") == current_hash:
+            continue
+
+        final_html = render_index(files, display_name)
+        output_hash = sha256(final_html)
+        if output_hash != current_hash:
+            changed.append(output_name)
+            if check:
+                continue
+            # Write the index.html file inside the folder
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(final_html)
+            print(f"✅ Updated {output_name} with {len(files)} items.")
+        manifest["outputs"][output_name] = {"inputs": input_key, "output": output_hash}
+
+    if not check:
+        save_manifest(manifest)
+    return changed
 
 if __name__ == "__main__":
-    generate_index()
+    parser = argparse.ArgumentParser(description="Regenerate the Micro_Apps and Micro_Games index pages")
+    parser.add_argument("--force", action="store_true", help="rebuild even if nothing changed")
+    parser.add_argument("--check", action="store_true", help="write nothing, exit 1 if an index is out of date")
+    args = parser.parse_args()
+
+    changed = generate_index(force=args.force, check=args.check)
+    if not changed:
+        print("Nothing to do, indexes are up to date.")
+    elif args.check:
+        print("Out of date: " + ", ".join(changed))
+        sys.exit(1)
 